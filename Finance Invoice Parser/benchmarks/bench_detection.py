@@ -0,0 +1,73 @@
+"""Statement type detection as issuers are added: one regex search per template in order
+(the previous get_template) vs. the single trie-shaped scan of TemplateRegistry. Extra
+issuers are copies of the card template with made-up fingerprints; page 1 comes from a
+synthetic statement, matching the last registered issuer (worst case for in-order checks).
+
+    python benchmarks/bench_detection.py --issuers 2 20 200 2000
+"""
+import sys, os, re, copy, time, random, argparse, tempfile, logging
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.chdir(tempfile.mkdtemp(prefix='bench_detection_'))
+
+from utils.statement import StatementDocument
+from utils.templates import TemplateRegistry, CHASE_CHECKING, CHASE_CARD
+from synthetic_statements import card_statement
+
+BANKS = ['Chase', 'Citi', 'Wells Fargo', 'Capital One', 'Discover', 'Barclays', 'US Bank', 'Amex', 'Synchrony', 'PNC']
+PRODUCTS = ['Total Checking', 'Premier Savings', 'Rewards Card', 'Cash Back', 'Business Account', 'Travel Card']
+
+def issuers(n):
+    """Card template copies with distinct, prefix-sharing fingerprints ('Citi Rewards Card 17')"""
+    rng = random.Random(0)
+    templates = []
+    for i in range(n):
+        template = copy.copy(CHASE_CARD)
+        template.name = f"issuer_{i}"
+        template.fingerprint = f"{rng.choice(BANKS)} {rng.choice(PRODUCTS)} {i} STATEMENT"
+        templates.append(template)
+    return templates
+
+def sequential(compiled, text):
+    """Previous implementation: search page 1 once per template (compiled up front), first hit wins"""
+    for fingerprint, template in compiled:
+        if fingerprint.search(text):
+            return template
+    return None
+
+def per_call(fn, *args, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(20):
+            result = fn(*args)
+        best = min(best, (time.perf_counter() - start) / 20)
+    return result, best
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--issuers', type=int, nargs='+', default=[2, 20, 200, 2000])
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    card_statement('card.pdf', transactions=40)
+    page = StatementDocument('card.pdf').page_text(1)
+    print(f"page 1: {len(page)} chars\n")
+    print(f"{'issuers':>8}{'in order us':>14}{'registry us':>14}{'compile ms':>12}{'speedup':>10}")
+    for n in args.issuers:
+        # the page's issuer is registered last
+        templates = [CHASE_CHECKING] + issuers(n - 2) + [copy.copy(CHASE_CARD)]
+        templates[-1].fingerprint = f"Chase Rewards Card {n} STATEMENT" if n > 2 else CHASE_CARD.fingerprint
+        text = page.replace(CHASE_CARD.fingerprint, templates[-1].fingerprint)
+
+        start = time.perf_counter()
+        registry = TemplateRegistry(templates)
+        registry.match('')  # builds the combined regex
+        compile_ms = (time.perf_counter() - start) * 1e3
+
+        compiled = [(re.compile(re.escape(t.fingerprint)), t) for t in templates]
+        old, old_s = per_call(sequential, compiled, text)
+        new, new_s = per_call(registry.match, text)
+        assert old is new is templates[-1], (old and old.name, new and new.name)
+        print(f"{n:>8}{old_s * 1e6:>14.1f}{new_s * 1e6:>14.1f}{compile_ms:>12.1f}{old_s / new_s:>9.1f}x")
@@ -0,0 +1,81 @@
+"""Startup cost of invoiceParser: the module import on its own, then each CLI subcommand
+run against an empty database in a scratch directory. Every case runs in a fresh
+interpreter under `python -X importtime`; reports wall time, the summed import time and
+the heaviest top-level imports, so a dependency that sneaks back onto a path shows up.
+
+    python benchmarks/bench_import_time.py --repeat 5
+    python benchmarks/bench_import_time.py --script /path/to/other/checkout/invoiceParser.py
+"""
+import sys, os, re, time, argparse, tempfile, subprocess, statistics
+from pathlib import Path
+from collections import defaultdict
+
+SCRIPT = Path(__file__).resolve().parents[1] / 'invoiceParser.py'
+# subcommands that finish on an empty database without network or a prompt
+COMMANDS = [['ingest'], ['categorize', '--no-review'], ['approve'], ['export']]
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|(\s+)(\S+)')
+
+def run_case(script: Path, argv, workdir) -> dict:
+    """Run one interpreter; returns wall seconds, summed import self time and cumulative time per top-level module"""
+    if argv is None:  # bare import, no CLI
+        cmd = [sys.executable, '-X', 'importtime', '-c', 'import invoiceParser']
+    else:
+        cmd = [sys.executable, '-X', 'importtime', str(script), *argv]
+    env = dict(os.environ, PYTHONPATH=str(script.parent))
+    start = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=workdir, env=env, stdin=subprocess.DEVNULL, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f"{' '.join(cmd)} failed:\n{proc.stderr[-2000:]}")
+
+    depth = 3 if argv is None else 1  # imported directly by invoiceParser / the script
+    imports, top = 0, {}
+    for line in proc.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match is None:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        imports += int(self_us)
+        if len(indent) == depth:
+            top[name] = int(cumulative_us)
+    return {'wall': wall, 'imports': imports / 1e6, 'top': top}
+
+def measure(script: Path, argv, repeat: int) -> dict:
+    """Median over repeat runs, each in a new scratch directory (empty db, fresh logs)"""
+    runs = []
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory(prefix='bench_import_') as workdir:
+            runs.append(run_case(script, argv, workdir))
+    top = defaultdict(list)
+    for run in runs:
+        for name, us in run['top'].items():
+            top[name].append(us)
+    return {
+        'wall': statistics.median(r['wall'] for r in runs),
+        'imports': statistics.median(r['imports'] for r in runs),
+        'top': {name: statistics.median(us) / 1e6 for name, us in top.items()},
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--script', type=Path, default=SCRIPT, help='invoiceParser.py to measure')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per case (median is reported)')
+    parser.add_argument('--top', type=int, default=5, help='heaviest imports listed per case')
+    args = parser.parse_args()
+    script = args.script.resolve()
+
+    cases = [('import', None)] + [(' '.join(argv), argv) for argv in COMMANDS]
+    results = {}
+    print(f"{script}\n")
+    print(f"{'case':<26}{'wall s':>9}{'import s':>10}")
+    for name, argv in cases:
+        try:
+            results[name] = measure(script, argv, args.repeat)
+        except RuntimeError:  # e.g. a checkout from before the subcommands existed
+            print(f"{name:<26}{'failed':>9}")
+            continue
+        print(f"{name:<26}{results[name]['wall']:9.3f}{results[name]['imports']:10.3f}")
+
+    for name in results:
+        heaviest = sorted(results[name]['top'].items(), key=lambda kv: -kv[1])[:args.top]
+        print(f"\n{name}: " + ', '.join(f"{module} {seconds:.3f}s" for module, seconds in heaviest))
@@ -0,0 +1,77 @@
+"""Benchmark the columnar line item extractors against the old per-match pd.concat loop.
+
+    python benchmarks/bench_line_items.py --lines 1000 5000
+"""
+import sys, re, time, random, argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import pandas as pd
+import invoiceParser as ip
+from utils.templates import CHASE_CHECKING, CHASE_CARD
+
+def legacy_line_items(page_content, fields):
+    """Previous implementation: one DataFrame per regex match, concatenated in the loop"""
+    df = pd.DataFrame()
+    for k, v in fields.items():
+        for item in re.findall(v['regex'], page_content):
+            dct = dict(zip(list(map(lambda x: f'{k}_{x}', v['expected_results'])), item))
+            df = pd.concat([df, pd.DataFrame([dct])], ignore_index=True)
+    df['adjusted_date'] = df[f'{k}_date'].apply(
+        lambda x: f"{ip.current_year - 1}/{x}" if x.startswith('12/') else f"{ip.current_year}/{x}"
+    )
+    df['adjusted_date'] = pd.to_datetime(df['adjusted_date'], format='%Y/%m/%d')
+    return df.sort_values(by='adjusted_date').reset_index(drop=True)
+
+CARD_FIELDS = {
+    'transaction': {
+        'regex': '(?P<date>\\d{2}\\/\\d{2})\\s+(?P<desc>.*?)\\s+(?P<bal>\\-?[\\d,.]+)\\n',
+        'expected_results': ['date', 'desc', 'amt']
+    }
+}
+WITHDRAWAL_FIELDS = {
+    'withdrawal': {
+        'regex': '(?P<date>\\d{2}\\/\\d{2})\\s+(?P<desc>.*?)\\s+(?P<amt>\\-?\\s*[\\d,]+\\.\\d{2})\\s+(?P<bal>[\\d,.]+)\\n',
+        'expected_results': ['date', 'desc', 'amt', 'bal']
+    }
+}
+
+def card_content(n_lines):
+    lines = ['ACCOUNT ACTIVITY']
+    for i in range(n_lines):
+        month = random.choice(['12', '01'])
+        lines.append(f"{month}/{random.randint(1, 28):02d} MERCHANT {i} SEATTLE WA {random.uniform(-50, 500):,.2f}")
+    return '\n'.join(lines) + '\nINTEREST CHARGES\n'
+
+def bank_content(n_lines):
+    lines, bal = ['TRANSACTION DETAIL'], 1e7
+    for i in range(n_lines):
+        amt = random.uniform(1, 200)
+        bal -= amt
+        lines.append(f"01/{random.randint(1, 28):02d} Card Purchase Store #{i} City ST -{amt:,.2f} {bal:,.2f}")
+    return '\n'.join(lines) + '\nA Monthly Service Fee\n'
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+def run(n_lines):
+    for name, content, new_fn, fields in [
+        ('card', card_content(n_lines), lambda c: ip.get_line_items(c.split('\n'), CHASE_CARD), CARD_FIELDS),
+        ('bank', bank_content(n_lines), lambda c: ip.get_line_items(c.split('\n'), CHASE_CHECKING), WITHDRAWAL_FIELDS),
+    ]:
+        old, old_s = timed(legacy_line_items, content, fields)
+        new, new_s = timed(new_fn, content)
+        assert len(old) == len(new) == n_lines, (len(old), len(new))
+        assert (old.iloc[:, 1].values == new['desc'].values).all()
+        print(f"{name:<5}{n_lines:>8} lines   concat {old_s:8.3f}s   columnar {new_s:8.3f}s   speedup {old_s / new_s:6.1f}x")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--lines', type=int, nargs='+', default=[500, 2000, 5000])
+    args = parser.parse_args()
+    random.seed(0)
+    for n in args.lines:
+        run(n)
@@ -0,0 +1,144 @@
+"""How the nearest neighbour tier treats merchants it has and has not seen: trained on
+categorized Chase-style lines for a few merchants (mostly in one home city), then asked about
+rows of those merchants the merchant memo would miss (new city; should be answered) and about
+merchants it never saw (should go to the llm). Compares the previous classifier (raw
+descriptions, hashed counts, no idf, every neighbour votes) with NeighbourCategorizer, over
+several seeds, and fails if an unseen merchant clears the threshold.
+
+    python benchmarks/bench_neighbours.py --rows 30 300 3000
+"""
+import sys, time, random, argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import numpy as np
+from utils.category_knn import NeighbourCategorizer
+from utils.merchants import normalize_merchant
+
+KNOWN = {
+    'WHOLEFDS': 'Groceries', 'TRADER JOE S': 'Groceries', 'SHELL OIL': 'Transportation',
+    'UBER *TRIP': 'Transportation', 'NETFLIX.COM': 'Entertainment', 'SPOTIFY USA': 'Entertainment',
+    'STARBUCKS STORE': 'Dining', 'SEATTLE CITY LIGHT': 'Utilities', 'COSTCO WHSE': 'Shopping',
+    'AMZN Mktp US': 'Shopping',
+}
+UNSEEN = ['CHIPOTLE ONLINE', 'HOME DEPOT', 'DELTA AIR LINES', 'WALGREENS', 'ALASKA AIR',
+          'PCC COMMUNITY MARKETS', 'REI.COM', 'COMCAST CABLE', 'LYFT *RIDE', 'APPLE.COM/BILL']
+CITIES = ['SEATTLE WA', 'BELLEVUE WA', 'REDMOND WA', 'PORTLAND OR', 'TACOMA WA', 'SPOKANE WA', 'BOISE ID']
+
+def line(rng, merchant):
+    day = f"{rng.randint(1, 12):02d}/{rng.randint(1, 28):02d}"
+    store = f" #{rng.randint(100, 99999)}" if rng.random() < 0.5 else ''
+    city = CITIES[0] if rng.random() < 0.7 else rng.choice(CITIES)
+    return f"Card Purchase {day} {merchant}{store} {city} Card 1234"
+
+def dataset(seed, rows, queries):
+    """(training rows, known merchant rows with a merchant key not in training, unseen merchant rows)"""
+    rng = random.Random(seed)
+    merchants = list(KNOWN)
+    train = [(line(rng, m), KNOWN[m]) for m in (rng.choice(merchants) for _ in range(rows))]
+    trained_keys = {normalize_merchant(d) for d, c in train}
+    known = []
+    while len(known) < queries:
+        merchant = rng.choice(merchants)
+        desc = line(rng, merchant)
+        if normalize_merchant(desc) not in trained_keys or rng.random() < 0.01:  # all seen keys: give up
+            known.append((desc, KNOWN[merchant]))
+    unseen = [line(rng, rng.choice(UNSEEN)) for _ in range(queries)]
+    return train, known, unseen
+
+class Legacy:
+    """Previous NeighbourCategorizer, verbatim: raw descriptions, l2 hashed counts, no idf,
+        every neighbour votes"""
+
+    def __init__(self, n_neighbors: int = 5, threshold: float = 0.6):
+        from sklearn.feature_extraction.text import HashingVectorizer  # sklearn/scipy load only when categorizing
+        self.n_neighbors = n_neighbors
+        self.threshold = threshold
+        self.vectorizer = HashingVectorizer(analyzer='char_wb', ngram_range=(3, 5), n_features=2 ** 18,
+                                            alternate_sign=False, norm='l2', lowercase=True)
+        self.X = None
+        self.labels = np.array([], dtype=object)
+        self._seen = set()
+        self._nn = None
+
+    def __len__(self):
+        return len(self.labels)
+
+    def add(self, descriptions: list, categories: list):
+        """Append labelled descriptions; duplicates of (description, category) are ignored"""
+        new = [(d, c) for d, c in zip(descriptions, categories) if d and c and (d, c) not in self._seen]
+        new = list(dict.fromkeys(new))
+        if not new:
+            return
+        self._seen.update(new)
+        import scipy.sparse as sp
+        from sklearn.neighbors import NearestNeighbors
+
+        X_new = self.vectorizer.transform([d for d, c in new])
+        self.X = X_new if self.X is None else sp.vstack([self.X, X_new], format='csr')
+        self.labels = np.concatenate([self.labels, np.array([c for d, c in new], dtype=object)])
+        # brute force cosine search just keeps a reference to X, so refitting is cheap
+        self._nn = NearestNeighbors(n_neighbors=min(self.n_neighbors, len(self.labels)),
+                                    metric='cosine', algorithm='brute').fit(self.X)
+
+    def predict(self, descriptions: list):
+        """Return (categories, confidences); category is None when confidence < threshold"""
+        if self._nn is None or not descriptions:
+            return [None] * len(descriptions), np.zeros(len(descriptions))
+
+        distances, indices = self._nn.kneighbors(self.vectorizer.transform(descriptions))
+        similarities = 1 - distances
+
+        predictions, confidences = [], np.zeros(len(descriptions))
+        for row, (sims, idx) in enumerate(zip(similarities, indices)):
+            votes, closest = {}, {}
+            for sim, label in zip(sims, self.labels[idx]):
+                votes[label] = votes.get(label, 0.0) + sim
+                closest[label] = max(closest.get(label, 0.0), sim)
+            label, mass = max(votes.items(), key=lambda item: item[1])
+            total = sum(votes.values())
+            confidences[row] = (mass / total) * closest[label] if total > 0 else 0.0
+            predictions.append(label if confidences[row] >= self.threshold else None)
+        return predictions, confidences
+
+def evaluate(model, known, unseen):
+    start = time.perf_counter()
+    predicted, confidence = model.predict([d for d, c in known] + unseen)
+    seconds = time.perf_counter() - start
+    k = len(known)
+    answered = [(p, c) for p, (d, c) in zip(predicted[:k], known) if p is not None]
+    labelled = [(d, p, s) for d, p, s in zip(unseen, predicted[k:], confidence[k:]) if p is not None]
+    return np.array([len(answered) / k, sum(p == c for p, c in answered) / max(len(answered), 1),
+                     len(labelled) / len(unseen), seconds * 1e3]), labelled
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, nargs='+', default=[30, 300, 3000], help='categorized training rows')
+    parser.add_argument('--queries', type=int, default=200, help='rows per query set')
+    parser.add_argument('--seeds', type=int, default=5)
+    parser.add_argument('--threshold', type=float, default=0.5)
+    args = parser.parse_args()
+
+    print(f"{len(KNOWN)} known merchants, threshold {args.threshold} (legacy: its own 0.6), mean of {args.seeds} seeds\n")
+    print(f"{'rows':>6}{'model':>8}{'known answered':>16}{'correct':>9}{'unseen labelled':>17}{'predict ms':>12}")
+    leaks = []
+    for rows in args.rows:
+        for name, make in [('legacy', lambda: Legacy(threshold=0.6)),
+                           ('tfidf', lambda: NeighbourCategorizer(threshold=args.threshold))]:
+            scores, examples = [], []
+            for seed in range(args.seeds):
+                train, known, unseen = dataset(seed, rows, args.queries)
+                model = make()
+                model.add([d for d, c in train], [c for d, c in train])
+                score, labelled = evaluate(model, known, unseen)
+                scores.append(score)
+                examples += labelled
+            answered, correct, unseen_rate, ms = np.mean(scores, axis=0)
+            print(f"{rows:>6}{name:>8}{answered:>16.0%}{correct:>9.0%}{unseen_rate:>17.1%}{ms:>12.1f}")
+            if name == 'tfidf':
+                leaks += examples
+            elif examples:
+                desc, category, conf = max(examples, key=lambda e: e[2])
+                print(f"{'':>14}e.g. {desc} -> {category} ({conf:.2f})")
+    assert not leaks, f"unseen merchants labelled: {leaks[:3]}"
@@ -0,0 +1,54 @@
+"""Parse a corpus of synthetic statements with every PDF backend, check the summary and line
+item frames match the pypdf baseline exactly, and report time per file and pages/sec.
+
+    python benchmarks/bench_pdf_backends.py --files 20 --transactions 150
+"""
+import sys, os, time, argparse, tempfile, logging
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.chdir(tempfile.mkdtemp(prefix='bench_pdf_backends_'))  # corpus + logs go here
+
+import pandas as pd
+import invoiceParser as ip
+from utils.pdf_backends import BACKENDS
+from synthetic_statements import write_corpus
+
+def parse_corpus(corpus, backend):
+    start = time.perf_counter()
+    results = [ip.parse_invoice(path, backend) for path, _ in corpus]
+    return results, time.perf_counter() - start
+
+def mismatches(baseline, results, corpus):
+    bad = []
+    for (path, expected), base, res in zip(corpus, baseline, results):
+        if res is None or len(res[3]) != expected:
+            bad.append(f"{path}: expected {expected} line items")
+            continue
+        for name, a, b in zip(('bank summary', 'card summary', 'line items'), base[1:], res[1:]):
+            try:
+                pd.testing.assert_frame_equal(a, b)
+            except AssertionError as e:
+                bad.append(f"{path} {name}: {str(e).splitlines()[0]}")
+    return bad
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--files', type=int, default=20)
+    parser.add_argument('--transactions', type=int, default=150)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)  # per-file parse logs would swamp the output
+
+    corpus = write_corpus(os.getcwd(), files=args.files, transactions=args.transactions)
+    print(f"{len(corpus)} synthetic statements in {os.getcwd()}\n")
+
+    pages = sum(BACKENDS['pypdf'](path).page_count() for path, _ in corpus)
+    baseline = None
+    for backend in BACKENDS:
+        results, elapsed = parse_corpus(corpus, backend)
+        baseline = baseline or results
+        bad = mismatches(baseline, results, corpus)
+        print(f"{backend:<10}{elapsed / len(corpus) * 1000:9.1f} ms/file{pages / elapsed:9.1f} pages/s   "
+              f"{'identical to pypdf' if not bad else f'{len(bad)} MISMATCHES'}")
+        for line in bad[:10]:
+            print(f"    {line}")
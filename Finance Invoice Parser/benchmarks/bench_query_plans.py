@@ -0,0 +1,88 @@
+"""Run the parser's real transactions queries over a synthetic multi-year table and show
+EXPLAIN QUERY PLAN plus timings, with and without the TRANSACTION_INDEXES set.
+
+    python benchmarks/bench_query_plans.py --years 10 --rows-per-month 500
+"""
+import sys, os, time, random, argparse, tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.chdir(tempfile.mkdtemp(prefix='bench_query_plans_'))  # finance_data.db + logs go here
+
+import invoiceParser as ip
+from utils.storage import get_connection
+
+MERCHANTS = ['WHOLEFDS MKT', 'SHELL OIL', 'NETFLIX.COM', 'AMZN Mktp US', 'UBER TRIP', 'CITY WATER', 'STARBUCKS']
+
+QUERIES = {
+    'uncategorized': (ip.UNCATEGORIZED_QUERY, ()),
+    'invoice rows': ('''
+        SELECT id, date, desc, transaction_amt, occurrence
+        FROM transactions
+        WHERE invoice_id = ?''', ('1234_20200105',)),
+    'date range': ('''
+        SELECT strftime('%Y-%m', adjusted_date) AS month, category, SUM(transaction_amt)
+        FROM transactions
+        WHERE adjusted_date BETWEEN ? AND ?
+        GROUP BY month, category''', ('2022-01-01', '2022-12-31')),
+    'monthly totals': ('''
+        SELECT month, category, total_amt
+        FROM monthly_category_totals
+        WHERE month BETWEEN ? AND ?''', ('2022-01', '2022-12')),
+    'category history': ('''
+        SELECT adjusted_date, desc, transaction_amt
+        FROM transactions
+        WHERE category = ? AND adjusted_date >= ?
+        ORDER BY adjusted_date''', ('Dining', '2023-01-01')),
+}
+
+def populate(conn, years, rows_per_month):
+    rows = []
+    for year in range(2025 - years, 2025):
+        for month in range(1, 13):
+            invoice_id = f"1234_{year}{month:02d}05"
+            for i in range(rows_per_month):
+                day = random.randint(1, 28)
+                category = None if random.random() < 0.02 else random.choice(ip.get_categories())
+                rows.append((invoice_id, f"{month:02d}/{day:02d}", f"{random.choice(MERCHANTS)} #{i % 50}",
+                             round(random.uniform(-300, 300), 2), i, None, f"{year}-{month:02d}-{day:02d}", category))
+    conn.executemany('''
+        INSERT INTO transactions
+        (invoice_id, date, desc, transaction_amt, occurrence, res_balance, adjusted_date, category)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)''', rows)
+    conn.commit()
+    conn.execute('ANALYZE')
+    return len(rows)
+
+def run_queries(conn, label, repeat):
+    print(f"\n--- {label}")
+    for name, (sql, params) in QUERIES.items():
+        plan = [row[-1] for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}', params)]
+        start = time.perf_counter()
+        for _ in range(repeat):
+            conn.execute(sql, params).fetchall()
+        elapsed = (time.perf_counter() - start) / repeat
+        conn.rollback()
+        print(f"{name:<18}{elapsed * 1000:9.2f} ms   {' | '.join(plan)}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--years', type=int, default=10)
+    parser.add_argument('--rows-per-month', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    random.seed(0)
+
+    ip.create_tables()
+    ip.update_table_schema('finance_data.db')
+    conn = get_connection()
+    print(f"{populate(conn, args.years, args.rows_per_month)} synthetic transactions in {os.getcwd()}")
+
+    run_queries(conn, 'with TRANSACTION_INDEXES', args.repeat)
+
+    # drop everything except the natural key (needed by upserts) to compare
+    for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'transactions' "
+                                "AND name LIKE 'transactions_%' AND name != 'transactions_natural_key'").fetchall():
+        conn.execute(f'DROP INDEX {name}')
+    conn.execute('ANALYZE')
+    run_queries(conn, 'natural key only', args.repeat)
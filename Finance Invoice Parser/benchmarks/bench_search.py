@@ -0,0 +1,107 @@
+"""Merchant search latency over a synthetic multi-year transactions table: LIKE '%term%'
+on desc (a full scan, or a date range scan when bounded) vs. search_transactions, which
+reads the transactions_fts index. Also the bulk insert cost of the FTS triggers.
+
+    python benchmarks/bench_search.py --years 10 --rows-per-month 1000
+"""
+import sys, os, time, random, string, argparse, tempfile, logging
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.chdir(tempfile.mkdtemp(prefix='bench_search_'))  # finance_data.db + logs go here
+
+import pandas as pd
+import invoiceParser as ip
+from utils.storage import get_connection
+from synthetic_statements import MERCHANTS
+
+# (search text, LIKE pattern, adjusted_date bounds); terms start a word so both find the same rows
+SEARCHES = [
+    ('AMZN', '%AMZN%', (None, None)),
+    ('AMZN', '%AMZN%', ('2024-01-01', '2025-01-01')),
+    ('netflix', '%netflix%', (None, None)),
+    ('ZZTOP', '%ZZTOP%', (None, None)),  # a rare merchant
+    ('trader joe', '%trader joe%', ('2020-01-01', '2021-01-01')),
+]
+
+def like_search(conn, pattern, start, end):
+    """The LIKE query this replaces, with the same columns, bounds and order"""
+    sql = '''
+        SELECT id, adjusted_date, desc, transaction_amt, res_balance, category, invoice_id
+        FROM transactions
+        WHERE desc LIKE ?'''
+    params = [pattern]
+    if start:
+        sql += ' AND adjusted_date >= ?'
+        params.append(start)
+    if end:
+        sql += ' AND adjusted_date < ?'
+        params.append(end)
+    return pd.read_sql_query(sql + ' ORDER BY adjusted_date DESC, id DESC', conn, params=params)
+
+def synthetic_rows(years, rows_per_month):
+    rng = random.Random(0)
+    tail = [''.join(rng.choice(string.ascii_uppercase) for _ in range(8)) + ' LLC' for _ in range(2000)]
+    rows = []
+    for year in range(2025 - years, 2025):
+        for month in range(1, 13):
+            invoice_id = f"1234_{year}{month:02d}05"
+            for i in range(rows_per_month):
+                day = rng.randint(1, 28)
+                merchant = rng.choice(MERCHANTS) if rng.random() < 0.6 else rng.choice(tail)
+                if rng.random() < 0.0005:
+                    merchant = 'ZZTOP TICKETS'
+                rows.append((invoice_id, f"{month:02d}/{day:02d}", f"Card Purchase {month:02d}/{day:02d} {merchant} Card 1234",
+                             round(rng.uniform(-300, 300), 2), i, None, f"{year}-{month:02d}-{day:02d}",
+                             rng.choice(['Groceries', 'Dining', 'Shopping', 'Utilities', None])))
+    return rows
+
+def insert(conn, rows):
+    start = time.perf_counter()
+    conn.executemany('''
+        INSERT INTO transactions
+        (invoice_id, date, desc, transaction_amt, occurrence, res_balance, adjusted_date, category)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)''', rows)
+    conn.commit()
+    return time.perf_counter() - start
+
+def timed(fn, *args, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--years', type=int, default=10)
+    parser.add_argument('--rows-per-month', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    ip.create_tables()
+    ip.update_table_schema('finance_data.db')
+    conn = get_connection()
+    rows = synthetic_rows(args.years, args.rows_per_month)
+
+    # write cost of the triggers: load once without them, then for real
+    for name in ('transactions_fts_insert', 'transactions_fts_delete', 'transactions_fts_update'):
+        conn.execute(f'DROP TRIGGER {name}')
+    without_s = insert(conn, rows)
+    conn.execute('DELETE FROM transactions')
+    conn.commit()
+    ip.update_table_schema('finance_data.db')
+    with_s = insert(conn, rows)
+    conn.execute('ANALYZE')
+    print(f"{len(rows)} synthetic transactions in {os.getcwd()}")
+    print(f"bulk insert: {len(rows) / without_s:,.0f} rows/s without FTS triggers, {len(rows) / with_s:,.0f} with\n")
+
+    print(f"{'search':<14}{'range':<24}{'rows':>7}{'LIKE ms':>10}{'FTS ms':>9}{'speedup':>10}")
+    for text, pattern, (start, end) in SEARCHES:
+        old, old_s = timed(like_search, conn, pattern, start, end, repeat=args.repeat)
+        new, new_s = timed(ip.search_transactions, text, start, end, repeat=args.repeat)
+        assert old['id'].tolist() == new['id'].tolist(), f"{text}: results differ"
+        bounds = f"{start or ''}..{end or ''}" if start or end else 'all'
+        print(f"{text:<14}{bounds:<24}{len(new):>7}{old_s * 1e3:>10.2f}{new_s * 1e3:>9.2f}{old_s / new_s:>9.1f}x")
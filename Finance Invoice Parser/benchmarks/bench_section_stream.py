@@ -0,0 +1,69 @@
+"""Peak memory and time of reading the activity section of long statements: streamed line
+by line into the tokenizer (section_lines) vs. the old get_page_content, which kept every
+page and grew one section string before parsing it. Memory is measured with tracemalloc.
+
+    python benchmarks/bench_section_stream.py --pages 10 40 --backend pymupdf
+"""
+import sys, os, time, argparse, tempfile, logging, tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.chdir(tempfile.mkdtemp(prefix='bench_section_stream_'))
+
+import invoiceParser as ip
+from utils.statement import StatementDocument
+from synthetic_statements import bank_statement, card_statement, LINES_PER_PAGE
+
+def legacy_page_content(doc, template, page_no=1):
+    """Previous implementation: every page cached on the document, section concatenated"""
+    total_pages = doc.total_pages
+    content = doc.page_text(page_no)
+    if template.section_start:
+        while not template.section_start.search(content):
+            if page_no == total_pages:
+                return ''
+            page_no += 1
+            content = doc.page_text(page_no)
+    result = content
+    while not template.section_end.search(content) and page_no < total_pages:
+        page_no += 1
+        content = doc.page_text(page_no)
+        result += content if result.endswith('\n') else '\n' + content
+    return result
+
+def legacy(doc, template):
+    return ip.get_line_items(legacy_page_content(doc, template).split('\n'), template)
+
+def streamed(doc, template):
+    return ip.get_line_items(ip.section_lines(doc, template), template)
+
+def measure(fn, path, backend):
+    doc = StatementDocument(path, backend)
+    template = ip.get_template(doc)
+    ip.get_summary_details(doc, template)  # page 1 is cached either way
+    tracemalloc.start()
+    start = time.perf_counter()
+    line_items = fn(doc, template)
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return line_items, seconds, peak, doc.pages_read
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pages', type=int, nargs='+', default=[10, 40], help='activity pages per statement')
+    parser.add_argument('--backend', default=ip.PDF_BACKEND)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    print(f"{'statement':<16}{'pages':>6}{'rows':>7}{'old s':>9}{'old MB':>9}{'stream s':>10}{'stream MB':>11}{'pages read':>12}")
+    for pages in args.pages:
+        transactions = pages * (LINES_PER_PAGE - 2)  # fills the activity section to about that many pages
+        for name, write in [('bank', bank_statement), ('card', card_statement)]:
+            path = f"{name}_{pages}.pdf"
+            write(path, transactions=transactions, pages=pages)
+            old, old_s, old_peak, _ = measure(legacy, path, args.backend)
+            new, new_s, new_peak, read = measure(streamed, path, args.backend)
+            assert old.equals(new), f"{path}: streamed line items differ"
+            print(f"{name:<16}{pages:>6}{len(new):>7}{old_s:>9.3f}{old_peak / 2**20:>9.2f}"
+                  f"{new_s:>10.3f}{new_peak / 2**20:>11.2f}{read:>12}")
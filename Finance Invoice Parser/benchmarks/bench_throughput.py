@@ -0,0 +1,141 @@
+"""Throughput of the ingest pipeline on synthetic statements, broken down by stage:
+type detection, summary extraction, line items (the section pages stream through the
+tokenizer, so this includes their extraction) and database write,
+then end to end through ingest_files. Reports files/s, pages/s, transactions/s and the
+peak RSS seen while each stage ran (this process only; --workers pools are not counted).
+
+    python benchmarks/bench_throughput.py --files 50 --transactions 300 --pages 6
+"""
+import sys, os, time, argparse, tempfile, threading, logging, resource, shutil
+from pathlib import Path
+from collections import defaultdict
+from contextlib import contextmanager
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.chdir(tempfile.mkdtemp(prefix='bench_throughput_'))  # corpus, db + logs go here
+
+import pandas as pd
+import invoiceParser as ip
+from utils.statement import StatementDocument
+from utils.storage import get_connection, close_connection
+from synthetic_statements import write_corpus
+
+STAGES = ['type detection', 'extraction', 'line items', 'db write']
+
+def current_rss() -> int:
+    """Resident set size in bytes (/proc on linux, else the process high-water mark)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        scale = 1 if sys.platform == 'darwin' else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+class StageMeter:
+    """Wall time per stage plus the peak RSS sampled (every interval seconds) while it ran"""
+
+    def __init__(self, interval=0.002):
+        self.seconds = defaultdict(float)
+        self.peak = defaultdict(int)
+        self.stage = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, args=(interval,), daemon=True)
+        self._thread.start()
+
+    def _sample(self, interval):
+        while not self._stop.wait(interval):
+            self._record()
+
+    def _record(self):
+        stage = self.stage
+        if stage is not None:
+            self.peak[stage] = max(self.peak[stage], current_rss())
+
+    @contextmanager
+    def __call__(self, stage):
+        self.stage = stage
+        self._record()  # stages shorter than the interval still get samples
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[stage] += time.perf_counter() - start
+            self._record()
+            self.stage = None
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+
+def run_stages(corpus, meter, backend, batch_size):
+    """The steps of parse_invoice + ingest_files, timed separately. Returns (pages, transactions)"""
+    conn = get_connection()
+    pages = transactions = pending = 0
+    for path, _ in corpus:
+        with meter('type detection'):
+            doc = StatementDocument(path, backend)
+            template = ip.get_template(doc)
+        with meter('extraction'):
+            summary = ip.get_summary_details(doc, template)
+        with meter('line items'):
+            line_items = ip.get_line_items(ip.section_lines(doc, template), template)
+            line_items['invoice_id'] = summary['invoice_id'].values[0]
+        with meter('db write'):
+            bank, card = (summary, pd.DataFrame()) if template.invoice_type == 'bank' else (pd.DataFrame(), summary)
+            ip.save_invoice_data(conn, bank, card, line_items)
+            pending += 1
+            if pending >= batch_size:
+                conn.commit()
+                pending = 0
+        pages += doc.total_pages
+        transactions += len(line_items)
+    with meter('db write'):
+        conn.commit()
+    return pages, transactions
+
+def fresh_database():
+    close_connection()
+    for name in ('finance_data.db', 'finance_data.db-wal', 'finance_data.db-shm'):
+        if os.path.exists(name):
+            os.remove(name)
+    ip.create_tables()
+    ip.update_table_schema('finance_data.db')
+
+def report(name, seconds, files, pages, transactions, peak):
+    print(f"{name:<16}{seconds:9.3f}{files / seconds:10.1f}{pages / seconds:10.1f}"
+          f"{transactions / seconds:12.0f}{peak / 2**20:12.1f}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--files', type=int, default=50)
+    parser.add_argument('--transactions', type=int, default=300, help='line items per statement')
+    parser.add_argument('--pages', type=int, default=0, help='pad statements with disclosure pages up to this')
+    parser.add_argument('--pdf-backend', default=ip.PDF_BACKEND)
+    parser.add_argument('-b', '--batch-size', type=int, default=ip.BATCH_SIZE)
+    parser.add_argument('-w', '--workers', type=int, default=1, help='workers for the end to end run')
+    args = parser.parse_args()
+    logging.disable(logging.INFO)  # per-file logs would swamp the report
+
+    corpus = write_corpus('corpus', files=args.files, transactions=args.transactions, pages=args.pages)
+    print(f"{len(corpus)} synthetic statements in {os.getcwd()}/corpus ({args.pdf_backend})\n")
+    print(f"{'stage':<16}{'seconds':>9}{'files/s':>10}{'pages/s':>10}{'trans/s':>12}{'peak MB':>12}")
+
+    fresh_database()
+    meter = StageMeter()
+    pages, transactions = run_stages(corpus, meter, args.pdf_backend, args.batch_size)
+    for stage in STAGES:
+        report(stage, meter.seconds[stage], len(corpus), pages, transactions, meter.peak[stage])
+
+    # end to end, including hashing, ledger and archiving
+    fresh_database()
+    for invoice_type in ('bank', 'card'):
+        os.makedirs(f"invoice_archive/{invoice_type}", exist_ok=True)
+    files = [shutil.copy(path, f"{path}.e2e.pdf") for path, _ in corpus]
+    with meter('ingest_files'):
+        ip.ingest_files(files, workers=args.workers, batch_size=args.batch_size, backend=args.pdf_backend)
+    report('ingest_files', meter.seconds['ingest_files'], len(corpus), pages, transactions, meter.peak['ingest_files'])
+    meter.close()
+
+    stored = get_connection().execute('SELECT COUNT(*) FROM transactions').fetchone()[0]
+    expected = sum(n for _, n in corpus)
+    print(f"\n{stored} of {expected} expected transactions stored")
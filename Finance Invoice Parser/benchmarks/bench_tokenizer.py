@@ -0,0 +1,60 @@
+"""Benchmark the line tokenizer against the transaction regexes it replaced, on statements
+whose descriptions are built to make those regexes backtrack: every date in a description
+is a candidate start that the lazy .*? (and the deposit rule's (?!.*-) lookahead) rescans
+to the end of the line. Also checks both produce the same fields.
+
+    python benchmarks/bench_tokenizer.py --lines 200 --tokens 50 200 800
+"""
+import sys, re, time, random, argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.line_tokenizer import tokenize
+from utils.templates import CHASE_CHECKING, CHASE_CARD
+
+def typical(i, tokens):
+    words = ' '.join(random.choice(['Card', 'Purchase', 'Store', f'#{i}', 'Seattle', 'WA']) for _ in range(tokens))
+    return f"01/{i % 28 + 1:02d} {words} -{random.uniform(1, 200):,.2f} {random.uniform(1e3, 1e4):,.2f}"
+
+def dated(i, tokens):
+    # dates all the way through and a dash at the end, but no amounts: nothing matches
+    return f"01/{i % 28 + 1:02d} " + ' '.join(f"12/{t % 28 + 1:02d}" for t in range(tokens)) + ' Ref -x'
+
+def numeric(i, tokens):
+    # dates and amounts alternating; only the final two tokens are the real amount and balance
+    body = ' '.join(f"01/{t % 28 + 1:02d} {t},000.00" for t in range(tokens // 2))
+    return f"01/{i % 28 + 1:02d} {body} -{random.uniform(1, 200):,.2f} {random.uniform(1e3, 1e4):,.2f}"
+
+CASES = {'typical': typical, 'dated': dated, 'numeric': numeric}
+
+def legacy(content, rules):
+    """Previous implementation: each rule's regex run over the whole section text"""
+    return [re.findall(rule.pattern, content) for rule in rules]
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+def run(case, n_lines, tokens):
+    content = '\n'.join(CASES[case](i, tokens) for i in range(n_lines)) + '\n'
+    for name, template in [('bank', CHASE_CHECKING), ('card', CHASE_CARD)]:
+        old, old_s = timed(legacy, content, template.line_items)
+        (new, _), new_s = timed(tokenize, content.split('\n')[:-1], template.line_items)
+        assert old == new, f"{case} {name}: tokenizer fields differ from the regexes"
+        rows = sum(len(found) for found in new)
+        print(f"{case:<9}{name:<6}{tokens:>7}{len(content) / n_lines:>9.0f}{rows:>7}"
+              f"{old_s:>10.4f}{new_s:>10.4f}{old_s / new_s:>9.1f}x")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--lines', type=int, default=200, help='transaction lines per statement')
+    parser.add_argument('--tokens', type=int, nargs='+', default=[50, 200, 800], help='description tokens per line')
+    parser.add_argument('--cases', nargs='+', choices=list(CASES), default=list(CASES))
+    args = parser.parse_args()
+    random.seed(0)
+    print(f"{'case':<9}{'rules':<6}{'tokens':>7}{'chars':>9}{'rows':>7}{'regex s':>10}{'lines s':>10}{'speedup':>10}")
+    for case in args.cases:
+        for tokens in args.tokens:
+            run(case, args.lines, tokens)
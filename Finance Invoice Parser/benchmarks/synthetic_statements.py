@@ -0,0 +1,152 @@
+"""Synthetic Chase-style statements rendered with PyMuPDF, laid out the way the parser
+expects (same key phrases, column order and page breaks). Nothing here is real data.
+
+    python benchmarks/synthetic_statements.py out/ --files 100 --transactions 300 --pages 8
+"""
+import os, random, argparse
+from datetime import date, timedelta
+import pymupdf
+
+MERCHANTS = ['WHOLEFDS SEA #10234', 'SHELL OIL 57444', 'NETFLIX.COM', 'AMZN Mktp US*2K4LB5XY3', 'UBER *TRIP',
+             'SEATTLE CITY LIGHT', 'STARBUCKS STORE 05521', 'TRADER JOE S #552', 'COSTCO WHSE #0008', 'SPOTIFY USA']
+LINES_PER_PAGE = 60
+DISCLOSURE = ['IN CASE OF ERRORS OR QUESTIONS ABOUT YOUR ELECTRONIC FUNDS TRANSFERS',
+              'Call us or write us at the telephone number or address on the front of this statement',
+              'as soon as you can, if you think your statement or receipt is incorrect or if you need',
+              'more information about a transfer listed on the statement or receipt.'] * 10
+COLUMNS = (36, 80, 430, 510)  # x of date, description, amount, balance
+
+def _render(path, pages):
+    """pages: list of pages, each a list of lines; a line is a str or a tuple of column cells"""
+    doc = pymupdf.open()
+    for lines in pages:
+        page = doc.new_page()
+        y = 36
+        for line in lines:
+            cells = (line,) if isinstance(line, str) else line
+            for x, cell in zip(COLUMNS, cells):
+                if cell:
+                    page.insert_text((x, y), cell, fontsize=8)
+            y += 12
+    doc.save(path)
+    doc.close()
+
+def _paginate(lines, first_page=(), continued='(continued)', lines_per_page=LINES_PER_PAGE):
+    """Split lines into pages; every page ends with a footer so no transaction is its last line"""
+    pages, page = [], list(first_page)
+    for line in lines:
+        if len(page) >= lines_per_page - 1:
+            pages.append(page)
+            page = [continued]
+        page.append(line)
+    pages.append(page)
+    for i, page in enumerate(pages, start=1):
+        page.append(f"Page {i} of {len(pages)}")
+    return pages
+
+def _pad(pages, min_pages):
+    """Append legal/disclosure pages (after every section the parser reads) up to min_pages"""
+    return pages + [list(DISCLOSURE) for _ in range(min_pages - len(pages))]
+
+def _money(value):
+    return f"{value:,.2f}"
+
+def bank_statement(path, transactions=40, seed=0, start=date(2025, 1, 1), pages=0, lines_per_page=LINES_PER_PAGE):
+    """Chase Total Checking statement, at least pages long.
+        Returns the number of line items the parser should find.
+    """
+    rng = random.Random(seed)
+    end = start + timedelta(days=30)
+    beginning = balance = round(rng.uniform(1000, 5000), 2)
+    rows, deposits, withdrawn = [], [], 0.0
+    for i in range(transactions):
+        day = start + timedelta(days=i * 30 // max(transactions, 1))
+        if i % 6 == 0:
+            amount = round(rng.uniform(500, 3000), 2)
+            balance += amount
+            deposits.append(amount)
+            rows.append((day.strftime('%m/%d'), f"Payroll Deposit Acme Corp PPD ID: {9000 + i}", '', _money(balance)))
+        else:
+            amount = round(rng.uniform(2, 250), 2)
+            balance -= amount
+            withdrawn += amount
+            rows.append((day.strftime('%m/%d'), f"Card Purchase {day:%m/%d} {rng.choice(MERCHANTS)} Card 1234",
+                         f"-{_money(amount)}", _money(balance)))
+
+    first_page = [
+        'JPMorgan Chase Bank, N.A.',
+        f"{start:%B %d, %Y} through {end:%B %d, %Y}",
+        'Account Number: 000000123456789',
+        'CUSTOMER SERVICE INFORMATION',
+        'Chase Total Checking',
+        'CHECKING SUMMARY',
+        f"Beginning Balance ${_money(beginning)}",
+        f"Deposits and Additions {_money(sum(deposits))}",
+        f"Electronic Withdrawals -{_money(withdrawn)}",
+        f"Ending Balance ${_money(balance)}",
+        'TRANSACTION DETAIL',
+    ]
+    # bolded deposit amounts come out of the pdf as their own block; long blocks run over
+    # several pages without footers (a footer line would end the block)
+    block = [f"Beginning Balance ${_money(beginning)}"] + [_money(d) for d in deposits] + \
+            [f"Ending Balance ${_money(balance)}", 'A Monthly Service Fee was not charged']
+    body = _paginate(rows, first_page, lines_per_page=lines_per_page) + \
+        [block[i:i + lines_per_page] for i in range(0, len(block), lines_per_page)]
+    _render(path, _pad(body, pages))
+    return transactions
+
+def card_statement(path, transactions=40, seed=0, start=date(2024, 12, 5), pages=0, lines_per_page=LINES_PER_PAGE):
+    """Chase credit card statement, at least pages long.
+        Returns the number of line items the parser should find.
+    """
+    rng = random.Random(seed)
+    end = start + timedelta(days=30)
+    rows, purchases = [], 0.0
+    for i in range(transactions):
+        day = start + timedelta(days=i * 30 // max(transactions, 1))
+        amount = round(rng.uniform(2, 400), 2) * (-1 if i % 10 == 0 else 1)  # negative: payment/credit
+        purchases += max(amount, 0)
+        rows.append((day.strftime('%m/%d'), f"{rng.choice(MERCHANTS)} SEATTLE WA", _money(amount)))
+
+    previous = round(rng.uniform(500, 3000), 2)
+    summary_page = [
+        'ACCOUNT SUMMARY',
+        f"Previous Balance ${_money(previous)}",
+        'Payment, Credits -$500.00',
+        f"Purchases +${_money(purchases)}",
+        'Cash Advances $0.00',
+        'Balance Transfers $0.00',
+        'Fees Charged $0.00',
+        'Interest Charged $0.00',
+        f"Opening/Closing Date {start:%m/%d/%y} - {end:%m/%d/%y}",
+        'Credit Access Line $15,000',
+        'Available Credit $12,500',
+        'Account Number: XXXX XXXX XXXX 4321',
+    ]
+    body = [summary_page] + _paginate(rows + ['INTEREST CHARGES'], ['ACCOUNT ACTIVITY'], lines_per_page=lines_per_page)
+    _render(path, _pad(body, pages))
+    return transactions
+
+def write_corpus(directory, files=10, transactions=40, seed=0, pages=0, lines_per_page=LINES_PER_PAGE):
+    """Alternate bank and card statements into directory; returns [(path, expected line items)]"""
+    os.makedirs(directory, exist_ok=True)
+    corpus = []
+    for i in range(files):
+        kind, make = (('bank', bank_statement) if i % 2 == 0 else ('card', card_statement))
+        path = f"{directory}/{kind}_{i:04d}.pdf"
+        corpus.append((path, make(path, transactions=transactions, seed=seed + i, pages=pages,
+                                  lines_per_page=lines_per_page,
+                                  start=date(2025, 1, 1) + timedelta(days=31 * (i // 2 % 11)))))
+    return corpus
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Write synthetic Chase checking and card statements')
+    parser.add_argument('directory')
+    parser.add_argument('--files', type=int, default=10)
+    parser.add_argument('--transactions', type=int, default=40, help='line items per statement')
+    parser.add_argument('--pages', type=int, default=0, help='pad each statement with disclosure pages up to this')
+    parser.add_argument('--lines-per-page', type=int, default=LINES_PER_PAGE)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    corpus = write_corpus(args.directory, args.files, args.transactions, args.seed, args.pages, args.lines_per_page)
+    print(f"Wrote {len(corpus)} statements to {args.directory}")
@@ -1,14 +1,22 @@
 # Copyright (C) Kevin Jin, <kevinjin21@gmail.com>, 2025
 
-from pypdf import PdfReader
-import tabula, os, shutil, sqlite3, re, glob, warnings
+import os, sys, shutil, glob, warnings, argparse, hashlib, time, asyncio, atexit, queue, signal, logging
 import numpy as np
 import pandas as pd
 from utils.record_events import RecordLogs
-import pymupdf
+from utils.statement import StatementDocument
+from utils.pdf_backends import BACKENDS
+from utils.templates import StatementTemplate, TEMPLATES
+from utils.line_tokenizer import tokenize
+from utils.storage import get_connection
+from utils.merchants import normalize_merchant
+from utils.category_knn import NeighbourCategorizer
+from utils.watcher import FolderWatcher
+from utils.export import export_parquet
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from typing import List, Dict
-from utils.category_llm import categorize_transaction
+from utils.category_llm import acategorize_transaction, acategorize_transactions_batch
 
 __version__ = '1.1'
 # v1.1: add llm-generated category column to db
@@ -18,11 +26,107 @@ LOG_LOC = f"logs/{LOG_NAME}-log-{datetime.now().strftime('%m-%d-%Y_%H-%M-%S')}.l
 warnings.filterwarnings('ignore', category=FutureWarning)
 warnings.filterwarnings('ignore', category=UserWarning)
 
-logger = RecordLogs(__version__, LOG_LOC, os.path.basename(__file__)).logger
+records = RecordLogs(__version__, LOG_LOC, os.path.basename(__file__))  # spans/counters -> logs/*.jsonl
+logger = records.logger
 current_year = datetime.now().year
+BATCH_SIZE = 50  # invoices committed per transaction during bulk loads
+PDF_BACKEND = 'pypdf'  # text extractor, see utils/pdf_backends.py and benchmarks/bench_pdf_backends.py
+CATEGORIZE_BATCH_SIZE = 25  # transaction descriptions per llm prompt
+CATEGORIZE_CONCURRENCY = 4  # llm requests in flight; match the Ollama server's OLLAMA_NUM_PARALLEL
+CATEGORIZE_TIMEOUT = 120  # seconds per llm request
+NEIGHBOUR_THRESHOLD = 0.5  # min nearest neighbour confidence to skip the llm (benchmarks/bench_neighbours.py)
+WATCH_FOLDERS = ['invoices/bank', 'invoices/card']
+WATCH_SETTLE = 2.0  # seconds a new pdf must stay unchanged before it is parsed
+WATCH_POLL_INTERVAL = 5.0  # seconds between folder scans when watchdog is not installed
+EXPORT_DIR = 'exports'  # parquet output for analysts, see utils/export.py
+_neighbour_categorizer = None
+_llm_loop = None
+
+# Index set for transactions, maintained by update_table_schema:
+#   natural key  - upserts; its invoice_id prefix also serves per-invoice lookups/deletes
+#   uncategorized - partial index, only rows still waiting for the llm (covers id, desc)
+#   adjusted_date - date range queries from the Power BI dashboards
+#   category     - per-category history, ordered by date
+TRANSACTION_INDEXES = [
+    '''CREATE UNIQUE INDEX IF NOT EXISTS transactions_natural_key
+       ON transactions (invoice_id, date, desc, transaction_amt, occurrence)''',
+    '''CREATE INDEX IF NOT EXISTS transactions_uncategorized
+       ON transactions (desc) WHERE category IS NULL''',
+    '''CREATE INDEX IF NOT EXISTS transactions_adjusted_date
+       ON transactions (adjusted_date)''',
+    '''CREATE INDEX IF NOT EXISTS transactions_category
+       ON transactions (category, adjusted_date)''',
+]
+
+# monthly_category_totals follows transactions through triggers, so upserts, stale row
+# deletes and approve_categories all keep it current; {row} is NEW or OLD, {sign} 1 or -1
+_TOTALS_DELTA = '''
+    INSERT INTO monthly_category_totals
+    (month, category, total_amt, debit_amt, credit_amt, transaction_count, modified_on)
+    SELECT strftime('%Y-%m', {row}.adjusted_date), COALESCE({row}.category, 'Uncategorized'),
+           {sign} * COALESCE({row}.transaction_amt, 0),
+           {sign} * MIN(COALESCE({row}.transaction_amt, 0), 0),
+           {sign} * MAX(COALESCE({row}.transaction_amt, 0), 0),
+           {sign}, datetime('now', 'localtime')
+    WHERE {row}.adjusted_date IS NOT NULL
+    ON CONFLICT(month, category) DO UPDATE SET
+        total_amt=ROUND(total_amt + excluded.total_amt, 2),
+        debit_amt=ROUND(debit_amt + excluded.debit_amt, 2),
+        credit_amt=ROUND(credit_amt + excluded.credit_amt, 2),
+        transaction_count=transaction_count + excluded.transaction_count,
+        modified_on=datetime('now', 'localtime');
+    DELETE FROM monthly_category_totals
+    WHERE month = strftime('%Y-%m', {row}.adjusted_date)
+      AND category = COALESCE({row}.category, 'Uncategorized')
+      AND transaction_count <= 0;'''
+
+MONTHLY_TOTALS_TRIGGERS = [
+    f'''CREATE TRIGGER IF NOT EXISTS transactions_totals_insert AFTER INSERT ON transactions
+       BEGIN {_TOTALS_DELTA.format(row='NEW', sign=1)}
+       END''',
+    f'''CREATE TRIGGER IF NOT EXISTS transactions_totals_delete AFTER DELETE ON transactions
+       BEGIN {_TOTALS_DELTA.format(row='OLD', sign=-1)}
+       END''',
+    f'''CREATE TRIGGER IF NOT EXISTS transactions_totals_update
+       AFTER UPDATE OF adjusted_date, category, transaction_amt ON transactions
+       WHEN OLD.adjusted_date IS NOT NEW.adjusted_date
+         OR OLD.category IS NOT NEW.category
+         OR OLD.transaction_amt IS NOT NEW.transaction_amt
+       BEGIN {_TOTALS_DELTA.format(row='OLD', sign=-1)} {_TOTALS_DELTA.format(row='NEW', sign=1)}
+       END''',
+]
+
+# transactions_fts indexes desc for merchant search (search_transactions). External content:
+# the text is only stored in transactions, and these triggers keep the index in step
+TRANSACTION_FTS = [
+    '''CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5(
+           desc, content='transactions', content_rowid='id')''',
+    '''CREATE TRIGGER IF NOT EXISTS transactions_fts_insert AFTER INSERT ON transactions
+       BEGIN
+           INSERT INTO transactions_fts (rowid, desc) VALUES (NEW.id, NEW.desc);
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS transactions_fts_delete AFTER DELETE ON transactions
+       BEGIN
+           INSERT INTO transactions_fts (transactions_fts, rowid, desc) VALUES ('delete', OLD.id, OLD.desc);
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS transactions_fts_update AFTER UPDATE OF desc ON transactions
+       WHEN OLD.desc IS NOT NEW.desc
+       BEGIN
+           INSERT INTO transactions_fts (transactions_fts, rowid, desc) VALUES ('delete', OLD.id, OLD.desc);
+           INSERT INTO transactions_fts (rowid, desc) VALUES (NEW.id, NEW.desc);
+       END''',
+]
+
+UNCATEGORIZED_QUERY = """
+    SELECT id, desc
+    FROM transactions 
+    WHERE category IS NULL 
+    AND desc IS NOT NULL 
+    AND desc != ''
+"""
 
 def create_tables():
-    conn = sqlite3.connect('finance_data.db')
+    conn = get_connection()
     cursor = conn.cursor()
     
     cursor.execute('''
@@ -73,427 +177,285 @@ def create_tables():
             FOREIGN KEY (invoice_id) REFERENCES summary(invoice_id)
         )
     ''')
-    
-    conn.commit()
-    conn.close()
-
-def get_inv_type(reader):
-    page = reader.pages[0]
-    content = page.extract_text()
-
-    '''_tmp_df = tabula.read_pdf(file_path, pages=1, stream=True, relative_area=True, area=(0, 18, 100, 100),
-                              pandas_options={'header': None}, silent=True)
-    _tmp_df[0].dropna(how='all', inplace=True)
-    _tmp_df[0] = _tmp_df[0].fillna('')
-    _tmp_df[0]['res'] = _tmp_df[0].apply(lambda x: ' '.join(x.dropna().astype(str)), axis=1)
-
-    for t in _tmp_df[0].res.to_list():
-        find_checking = re.findall('CHECKING SUMMARY', content)
-        find_credit = re.findall('ACCOUNT_SUMMARY', content)
-        if len(find_checking) > 0:
-            return 'bank'
-        if len(find_credit) > 0:
-            return 'card'
-    '''
-        
-    find_checking = re.findall('Chase Total Checking', content)
-    if len(find_checking) > 0:
-        return 'bank'
-    find_credit = re.findall('ACCOUNT SUMMARY', content)
-    if len(find_credit) > 0:
-        return 'card'
 
-    return 'unknown'
-
-def get_page_content(page_no, total_pages, reader, invoice_type):
-    if invoice_type == 'bank':
-        pattern = 'A Monthly Service Fee'
-    elif invoice_type == 'card':
-        pattern = 'INTEREST CHARGES'
-    else:
-        return ''
-
-    page = reader.pages[page_no - 1]
-    content = page.extract_text()      
-
-    # skip pages until reaching card activity section
-    if invoice_type == 'card':
-        start = re.findall('ACCOUNT ACTIVITY', content)
-        while len(start) == 0:
-            if page_no == total_pages:
-                logger.info(f"Couldn't find transaction details.")
-                return ''
-            page_no += 1
-            page = reader.pages[page_no - 1]
-            content = page.extract_text()
-            start = re.findall('ACCOUNT ACTIVITY', content)
-
-    result = content 
-    check = len(re.findall(pattern, content))
-
-    # end page_content when reaching the search word
-    while check == 0 and page_no < total_pages:
-        page_no += 1
-        page = reader.pages[page_no - 1]
-        content = page.extract_text()
-        result += content
-        check = len(re.findall(pattern, content))
-
-    return result
-
-def get_bank_summary_details(reader):
-    page = reader.pages[0]
-    content = page.extract_text()
-
-    fields = {
-        'beginning': {
-            'regex': 'Beginning Balance\s+\$([\d.,]+)',
-            'expected_results': ['balance']
-        },
-        'ending': {
-            'regex': 'Ending Balance\s+\$([\d.,]+)',
-            'expected_results': ['balance']
-        },
-        'deposits': {
-            'regex': 'Deposits and Additions\s+([\d,.]+)',
-            'expected_results': ['additions']
-        },
-        'electronic': {
-            'regex': 'Electronic Withdrawals\s+\-([\d,.]+)',
-            'expected_results': ['withdrawals']
-        },
-        'date': {
-            #'regex': '(?P<start>.*)\s+through\s+(?P<end>.*)',
-            'regex': '\\n(?P<start>[\w\s,]+)\s*through\s*(?P<end>[\w\s,]+)\\n',
-            'expected_results': ['start', 'end']
-        },
-        'account': {
-            'regex': '(\d+)\\nCUSTOMER',
-            'expected_results': ['number']
-        }
-    }
-
-    _rs_dct = {}
-    try:
-        for k, v in fields.items():
-            find = re.findall(v['regex'], content)
-            if len(find) > 0:
-                f = list(find[0]) if type(find[0]) is tuple else find
-                dct = dict(
-                    zip(list(map(lambda x: f'{k}_{x}', v['expected_results'])), f[-len(v['expected_results']):]))
-                _rs_dct.update(dct)
-    except Exception as e:
-        logger.info(f"Couldn't read summary: {e}")
-        return pd.DataFrame()
+    # confirmed category per normalized merchant description, consulted before the llm
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS merchant_categories (
+            merchant_key TEXT PRIMARY KEY,
+            category TEXT,
+            hits INTEGER DEFAULT 0,
+            created_on DATETIME DEFAULT (datetime('now', 'localtime')),
+            modified_on DATETIME DEFAULT (datetime('now', 'localtime'))
+        )
+    ''')
 
-    df = pd.DataFrame([_rs_dct])
+    # one row per pdf content hash; checked before parsing so re-dropped files are skipped
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ingestion_ledger (
+            content_hash TEXT PRIMARY KEY,
+            file_name TEXT,
+            invoice_type TEXT,
+            invoice_id TEXT,
+            status TEXT,
+            parse_seconds REAL,
+            created_on DATETIME DEFAULT (datetime('now', 'localtime')),
+            modified_on DATETIME DEFAULT (datetime('now', 'localtime'))
+        )
+    ''')
 
-    # Ensure required columns exist with float 0.0 default
-    required_cols = {
-        'beginning_balance': 0.0,
-        'ending_balance': 0.0,
-        'deposits_additions': 0.0,
-        'electronic_withdrawals': 0.0
-    }
-    
-    for col, default_val in required_cols.items():
-        if col not in df.columns:
-            df[col] = default_val
-
-    # float columns
-    convert_cols = ['beginning_balance', 'ending_balance', 'deposits_additions', 'electronic_withdrawals']
-    df.loc[:, df.columns.isin(convert_cols)] = df.loc[:, df.columns.isin(convert_cols)].replace('[\,\$\s]', '',
-                                                                                                regex=True).fillna(0).astype(float)
-    
-    # negative amounts (withdrawals)
-    if 'electronic_withdrawals' in df.columns:
-        df['electronic_withdrawals'] = df['electronic_withdrawals'] * -1
-    
-    # clean date columns
-    convert_cols = ['date_start', 'date_end']
-    for col in convert_cols:
-        df[col] = df[col].str.strip()
-        df[col] = pd.to_datetime(df[col], format='%B %d, %Y', errors='coerce')  # Convert to datetime
-
-    # rename columns
-    df = df.rename(columns={
-        'deposits_additions': 'deposits',
-        'electronic_withdrawals': 'withdrawals'
-    })
-    
-    # generate invoice id: last 4 digits of account number + start date
-    df['invoice_id'] = df['account_number'].str[-4:] + '_' + df['date_start'].dt.strftime('%Y%m%d')
-    return df
+    # precomputed spend per month and category for the dashboards (see MONTHLY_TOTALS_TRIGGERS)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS monthly_category_totals (
+            month TEXT NOT NULL,
+            category TEXT NOT NULL,
+            total_amt REAL,
+            debit_amt REAL,
+            credit_amt REAL,
+            transaction_count INTEGER,
+            modified_on DATETIME DEFAULT (datetime('now', 'localtime')),
+            PRIMARY KEY (month, category)
+        )
+    ''')
 
-def get_card_summary_details(reader):
-    page = reader.pages[0]
-    content = page.extract_text()
-
-    fields = {
-        'card': {
-            'regex': 'X{4}\s+(\d{4})',
-            'expected_results': ['number']
-        },
-        'previous': {
-            'regex': 'Previous Balance\s+\$([\d,.]+)',
-            'expected_results': ['balance']
-        },
-        'current': {
-            'regex': 'Purchases\s+\+\$([\d,.]+)',
-            'expected_results': ['balance']
-        },
-        'date': {
-            'regex': 'Opening/Closing Date\s+(?P<start>\d+/\d+/\d+)[\s\-]+(?P<end>\d+/\d+/\d+)',
-            'expected_results': ['start', 'end']
-        },
-        'cash': {
-            'regex': 'Cash Advances\s+\$(-?[\d,.]+)',
-            'expected_results': ['advances']
-        },
-        'balance': {
-            'regex': 'Balance Transfers\s+\$(-?[\d,.]+)',
-            'expected_results': ['transfers']
-        },
-        'fees': {
-            'regex': 'Fees Charged\s+\$(-?[\d,.]+)',
-            'expected_results': ['charged']
-        },
-        'interest': {
-            'regex': 'Interest Charged\s+\$(-?[\d,.]+)',
-            'expected_results': ['charged']
-        },
-        'available': {
-            'regex': 'Available Credit\s+\$([\d,.]+)',
-            'expected_results': ['credit']
-        },
-        'credit': {
-            'regex': 'Credit Access Line\s+\$([\d,.]+)',
-            'expected_results': ['limit']
-        },
-    }
-
-    _rs_dct = {}
-    try:
-        for k, v in fields.items():
-            find = re.findall(v['regex'], content)
-            if len(find) > 0:
-                f = list(find[0]) if type(find[0]) is tuple else find
-                dct = dict(
-                    zip(list(map(lambda x: f'{k}_{x}', v['expected_results'])), f[-len(v['expected_results']):]))
-                _rs_dct.update(dct)
-    except Exception as e:
-        logger.info(f"Couldn't read summary: {e}")
-        return pd.DataFrame()
+    # llm/memo/neighbour proposals wait here, checkpointed as they are produced, until approved
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS categorization_runs (
+            run_id TEXT PRIMARY KEY,
+            status TEXT,
+            proposals INTEGER DEFAULT 0,
+            created_on DATETIME DEFAULT (datetime('now', 'localtime')),
+            modified_on DATETIME DEFAULT (datetime('now', 'localtime'))
+        )
+    ''')
 
-    df = pd.DataFrame([_rs_dct])
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS category_proposals (
+            transaction_id INTEGER PRIMARY KEY,
+            run_id TEXT,
+            category TEXT,
+            source TEXT,
+            created_on DATETIME DEFAULT (datetime('now', 'localtime'))
+        )
+    ''')
 
-    # Ensure required columns exist with float 0.0 default
-    required_cols = {
-        'previous_balance': 0.0,
-        'current_balance': 0.0,
-    }
-    
-    for col, default_val in required_cols.items():
-        if col not in df.columns:
-            df[col] = default_val
+    # high-water mark of modified_on per parquet export target (utils/export.py)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS parquet_exports (
+            out_dir TEXT NOT NULL,
+            table_name TEXT NOT NULL,
+            exported_through DATETIME,
+            utc_offset INTEGER,
+            partitions_written INTEGER,
+            exported_on DATETIME DEFAULT (datetime('now', 'localtime')),
+            PRIMARY KEY (out_dir, table_name)
+        )
+    ''')
     
-    # rename columns to match database schema
-    df = df.rename(columns={
-        'fees_charged': 'fees',
-        'interest_charged': 'interest'
-    })
+    conn.commit()
 
-    # float columns
-    convert_cols = ['previous_balance', 'current_balance', 'cash_advances', 'balance_transfers', 'fees', 'interest', 'available_credit', 'credit_limit']
-    df.loc[:, df.columns.isin(convert_cols)] = df.loc[:, df.columns.isin(convert_cols)].replace('[\,\$\s]', '',
-                                                                                                regex=True).fillna(0).astype(float)
-    
-    # clean date columns
-    convert_cols = ['date_start', 'date_end']
-    for col in convert_cols:
-        df[col] = df[col].str.strip()
-        df[col] = pd.to_datetime(df[col], format='%m/%d/%y', errors='coerce')
-    # generate invoice id: last 4 digits of account number + start date
-    df['invoice_id'] = df['card_number'][0] + '_' + df['date_start'].dt.strftime('%Y%m%d')
-    return df
+def get_template(doc: StatementDocument):
+    """Statement template whose fingerprint is on page 1, None if no layout matches.
+        The templates then supply the section bounds, summary fields and line item rules.
+    """
+    return TEMPLATES.match(doc.page_text(1))
 
-def get_bank_line_items(page_content):
-    fields = {
-        'withdrawal': {
-            #'regex': '(?P<date>\d{2}\/\d{2})\s+(?P<desc>.*?)\s+(?P<amt>[-\d,]+\.\d{2})\s+(?P<bal>[\d,.]+)',
-            'regex': '(?P<date>\d{2}\/\d{2})\s+(?P<desc>.*?)\s+(?P<amt>\-?\s*[\d,]+\.\d{2})\s+(?P<bal>[\d,.]+)\\n',
-            'expected_results': ['date', 'desc', 'amt', 'bal']
-        },
-        'deposit': {
-            'regex': '(?P<date>\d{2}\/\d{2})\s+(?!.*-)(?P<desc>.*?)\s+(?P<bal>[\d,.]+)\\n',
-            'expected_results': ['date', 'desc', 'bal']
-        }
-    }
-
-    df = pd.DataFrame()
-    try:
-        _rs_dct = {}
-        for k, v in fields.items():
-            find = re.findall(v['regex'], page_content)
-            if len(find) > 0:
-                for item in find:
-                    dct = dict(
-                    zip(list(map(lambda x: f'{k}_{x}', v['expected_results'])), item))
-                    df = pd.concat([df, pd.DataFrame([dct])], ignore_index=True) 
-    except Exception as e:
-        logger.info(f"Couldn't read transaction line item: {e}")
+def get_inv_type(doc: StatementDocument):
+    template = get_template(doc)
+    return template.invoice_type if template else 'unknown'
+
+def section_lines(doc: StatementDocument, template: StatementTemplate):
+    """Yield the activity section line by line as each page is read: from the line matching
+        section_start (card statements; bank statements start on page 1) through the line
+        matching section_end. Later pages are never extracted and read pages are not kept.
+    """
+    started = template.section_start is None
+    for page_no in range(1, doc.total_pages + 1):
+        for line in doc.page_lines(page_no, keep=page_no == 1):  # page 1 is also read for the summary
+            if not started:
+                if not template.section_start.search(line):
+                    continue
+                started = True
+            yield line
+            if template.section_end.search(line):
+                return
+    if not started:
+        logger.info(f"Couldn't find transaction details.")
+
+def get_summary_details(doc: StatementDocument, template: StatementTemplate):
+    """One row summary frame typed for the template's summary table (always first page)"""
+    summary = template.read_summary(doc.page_text(1))
+    invoice_id = template.invoice_id(summary)
+    if invoice_id is None:
+        logger.info(f"Couldn't read summary: missing {template.id_column} or start date")
         return pd.DataFrame()
-    
-    if 'deposit_bal' in df.columns:
-        deposits = re.findall('Beginning Balance.*?\\n([\d,.\\n]+)\\nEnding Balance', page_content)
-        if len(deposits) == 0:
-            logger.info("Deposit amounts not found despite being present in the invoice.")
-            return pd.DataFrame()
-        
-        deposits = deposits[0].split('\n')
-        if len(deposits) != df['deposit_bal'].notnull().sum():
-            # number of bolded deposits should match number of line item deposits
-            logger.info("Number of deposit amounts does not match the number of line items.")
-            return pd.DataFrame()
-        extra_rows = len(df) - len(deposits)
-        deposits = [0]*extra_rows + deposits # add padding for withdrawal rows
-        df['deposit_amt'] = deposits
-
-    # float columns
-    convert_cols = ['withdrawal_amt', 'withdrawal_bal', 'deposit_bal', 'deposit_amt']
-    df.loc[:, df.columns.isin(convert_cols)] = df.loc[:, df.columns.isin(convert_cols)].replace('[\,\$\s]', '',
-                                                                                            regex=True).fillna(0).astype(float)
-
-       # combining withdrawal and deposit columns - floats
-    df['res_balance'] = df.get('withdrawal_bal', pd.Series([0]*len(df))).fillna(0) + \
-                       df.get('deposit_bal', pd.Series([0]*len(df))).fillna(0)
-    df['transaction_amt'] = df.get('withdrawal_amt', pd.Series([0]*len(df))).fillna(0) + \
-                           df.get('deposit_amt', pd.Series([0]*len(df))).fillna(0)
-    df.drop(columns=['withdrawal_bal', 'deposit_bal', 'withdrawal_amt', 'deposit_amt'], inplace=True, errors='ignore')
-
-    # combining columns - strings
-    df['desc'] = df.get('withdrawal_desc', pd.Series([''] * len(df))).fillna('') + \
-                 df.get('deposit_desc', pd.Series([''] * len(df))).fillna('')
-    df['date'] = df.get('withdrawal_date', pd.Series([''] * len(df))).fillna('') + \
-                 df.get('deposit_date', pd.Series([''] * len(df))).fillna('')
-    df.drop(columns=['withdrawal_desc', 'withdrawal_date', 'deposit_desc', 'deposit_date'], inplace=True, errors='ignore')
-
-    '''# clean up column names
-    _l = list(map(lambda x: x.replace("line_item_", ''), df.columns.to_list()))
-    df.rename(columns=dict(zip(df.columns, _l)), inplace=True)'''  
-
-    # sort by date -> format as datetime first
-    df['adjusted_date'] = df['date'].apply(
-    lambda x: f"{current_year - 1}/{x}" if x.startswith('12/') else f"{current_year}/{x}"
-    )
-    df['adjusted_date'] = pd.to_datetime(df['adjusted_date'], format='%Y/%m/%d')
-    df = df.sort_values(by='adjusted_date').reset_index(drop=True)
 
-    # Drop the adjusted_date column if no longer needed
-    # df.drop(columns=['adjusted_date'], inplace=True)
+    summary['invoice_id'] = invoice_id
+    return pd.DataFrame([summary])
 
-    return df
+def clean_amounts(values) -> np.ndarray:
+    """Strip $ , and whitespace from matched amount strings and convert to float"""
+    return pd.Series(values, dtype=object).str.replace('[\\,\\$\\s]', '', regex=True).astype(float).to_numpy()
+
+def adjust_dates(dates: pd.Series) -> pd.Series:
+    """Statement dates are MM/DD only; December items belong to the previous year"""
+    years = np.where(dates.str.startswith('12/'), current_year - 1, current_year).astype(str)
+    return pd.to_datetime(years + '/' + dates.to_numpy(dtype=str), format='%Y/%m/%d')
 
-def get_card_line_items(page_content):
-    fields = {
-        'transaction': {
-            'regex': '(?P<date>\d{2}\/\d{2})\s+(?P<desc>.*?)\s+(?P<bal>\-?[\d,.]+)\\n',
-            'expected_results': ['date', 'desc', 'amt']
-        }
-    }
+def build_line_items(date, desc, transaction_amt, res_balance) -> pd.DataFrame:
+    """Build the line item frame once from column lists, sorted by adjusted_date"""
+    df = pd.DataFrame({
+        'date': pd.Series(date, dtype=object),
+        'desc': pd.Series(desc, dtype=object),
+        'transaction_amt': np.asarray(transaction_amt, dtype=float),
+        'res_balance': np.asarray(res_balance, dtype=float)
+    })
+    df['adjusted_date'] = adjust_dates(df['date'])
+    return df.sort_values(by='adjusted_date').reset_index(drop=True)
 
-    df = pd.DataFrame()
+def get_line_items(lines, template: StatementTemplate):
+    """Line items from an iterable of section lines, e.g. section_lines(); read in one pass"""
     try:
-        _rs_dct = {}
-        for k, v in fields.items():
-            find = re.findall(v['regex'], page_content)
-            if len(find) > 0:
-                for item in find:
-                    dct = dict(
-                    zip(list(map(lambda x: f'{k}_{x}', v['expected_results'])), item))
-                    df = pd.concat([df, pd.DataFrame([dct])], ignore_index=True) 
+        matches, block = tokenize(lines, template.line_items, template.amount_block)
     except Exception as e:
         logger.info(f"Couldn't read transaction line item: {e}")
         return pd.DataFrame()
 
-    # float columns
-    convert_cols = ['transaction_amt'] # there's only one float column in the card statement...
-    df.loc[:, df.columns.isin(convert_cols)] = df.loc[:, df.columns.isin(convert_cols)].replace('[\,\$\s]', '',
-                                                                                            regex=True).fillna(0).astype(float)
-    # flip sign for card transactions - negative is credit and positive is charge
-    df.loc[:, df.columns.isin(convert_cols)] = df.loc[:, df.columns.isin(convert_cols)].mul(-1)
-
-    '''# clean up column names
-    _l = list(map(lambda x: x.replace("line_item_", ''), df.columns.to_list()))
-    df.rename(columns=dict(zip(df.columns, _l)), inplace=True)'''  
-
-    # rename columns to match database schema
-    df = df.rename(columns={
-        'transaction_date': 'date',
-        'transaction_desc': 'desc'
-    })
-
-    # add res_balance column to match database schema
-    df['res_balance'] = np.nan
-    df['res_balance'] = df['res_balance'].astype(float)
-
-    # sort by date -> format as datetime first
-    df['adjusted_date'] = df['date'].apply(
-    lambda x: f"{current_year - 1}/{x}" if x.startswith('12/') else f"{current_year}/{x}"
+    date, desc, transaction_amt, res_balance = (), (), [], []
+    for rule, found in zip(template.line_items, matches):
+        if not found:
+            continue
+
+        columns = dict(zip(rule.columns, zip(*found)))
+        if 'amt' in columns:
+            amounts = columns['amt']
+        else:
+            # amounts are bolded and extracted as a separate block (bank deposits)
+            if block is None:
+                logger.info("Deposit amounts not found despite being present in the invoice.")
+                return pd.DataFrame()
+
+            amounts = block
+            if len(amounts) != len(found):
+                # number of bolded deposits should match number of line item deposits
+                logger.info("Number of deposit amounts does not match the number of line items.")
+                return pd.DataFrame()
+
+        date += columns['date']
+        desc += columns['desc']
+        transaction_amt.append(clean_amounts(amounts) * template.amount_sign)
+        res_balance.append(clean_amounts(columns['bal']) if 'bal' in columns else np.full(len(found), np.nan))
+
+    return build_line_items(
+        date=date,
+        desc=desc,
+        transaction_amt=np.concatenate(transaction_amt) if transaction_amt else [],
+        res_balance=np.concatenate(res_balance) if res_balance else []
     )
-    df['adjusted_date'] = pd.to_datetime(df['adjusted_date'], format='%Y/%m/%d')
-    df = df.sort_values(by='adjusted_date').reset_index(drop=True)
-
-    # Drop the adjusted_date column if no longer needed
-    # df.drop(columns=['adjusted_date'], inplace=True)
 
-    return df
-
-def extract_invoice_data(file_path):
+def parse_invoice(file_path, backend: str = PDF_BACKEND):
+    """Read a statement pdf and return (invoice_type, bank_summary, card_summary, line_items).
+        No database access here, so this is safe to run in a worker process.
+    """
     logger.info(f"Processing file {file_path}")
-    reader = PdfReader(file_path)
-    total_pages = reader.get_num_pages()
-    page_no = 1
+    file_name = os.path.basename(file_path)
 
     # determine invoice type
-    invoice_type = get_inv_type(reader)
-    if invoice_type == 'unknown':
+    with records.span('detect', file=file_name, backend=backend) as span:
+        doc = StatementDocument(file_path, backend)  # each page is extracted at most once
+        template = get_template(doc)
+        span['template'] = template.name if template else None
+    if template is None:
         logger.info("Unexpected invoice type, formatting of invoice may have changed.")
-        return
+        return None
 
-    logger.info(f"Reading invoice:")
-    line_items = pd.DataFrame()
+    invoice_type = template.invoice_type
+    logger.info(f"Reading invoice ({template.name}):")
     bank_summary, card_summary = pd.DataFrame(), pd.DataFrame()
-    page_content = get_page_content(page_no, total_pages, reader, invoice_type)
+    with records.span('extract', file=file_name):
+        summary = get_summary_details(doc, template)
+    # section pages are extracted as the line items are read, so this span includes extraction
+    with records.span('line_items', file=file_name) as span:
+        line_items = get_line_items(section_lines(doc, template), template)
+        line_items['invoice_id'] = summary['invoice_id'].values[0] if not summary.empty else None
+        span.update(rows=len(line_items), pages_read=doc.pages_read, total_pages=doc.total_pages)
+    # TEMPLATES only registers 'bank' and 'card' templates
     if invoice_type == 'bank':
-        line_items = get_bank_line_items(page_content)
-        bank_summary = get_bank_summary_details(reader)  # always first page
-        line_items['invoice_id'] = bank_summary['invoice_id'].values[0] if not bank_summary.empty else None
-    elif invoice_type == 'card':
-        line_items = get_card_line_items(page_content)
-        card_summary = get_card_summary_details(reader)
-        line_items['invoice_id'] = card_summary['invoice_id'].values[0] if not card_summary.empty else None
+        bank_summary = summary
     else:
-        logger.info("Unknown invoice type, unable to parse line items.")
-        return
+        card_summary = summary
 
-    # Log summary and line items data
-    if not bank_summary.empty:
-        logger.info("\nSummary Data Table:")
-        logger.info("\n" + bank_summary.to_string(index=False))
+    logger.info(f"Parsed {len(line_items)} line items from {doc.pages_read}/{doc.total_pages} pages")
+    # Log summary and line items data; to_string() is only paid for with --debug
+    if logger.isEnabledFor(logging.DEBUG):
+        if not bank_summary.empty:
+            logger.debug("\nSummary Data Table:")
+            logger.debug("\n" + bank_summary.to_string(index=False))
 
-    if not card_summary.empty:
-        logger.info("\nSummary Data Table:")
-        logger.info("\n" + card_summary.to_string(index=False))
-    
-    if not line_items.empty:
-        logger.info(f"\nTransaction Line Items Table ({len(line_items)} records):")
-        logger.info("\n" + line_items.to_string(index=True))
+        if not card_summary.empty:
+            logger.debug("\nSummary Data Table:")
+            logger.debug("\n" + card_summary.to_string(index=False))
+        
+        if not line_items.empty:
+            logger.debug(f"\nTransaction Line Items Table ({len(line_items)} records):")
+            logger.debug("\n" + line_items.to_string(index=True))
+
+    return invoice_type, bank_summary, card_summary, line_items
 
-    # save parsed data to sqlite db
-    conn = sqlite3.connect('finance_data.db')
+def upsert_transactions(cursor, line_items: pd.DataFrame):
+    """Diff an invoice's parsed line items into transactions on the natural key
+        (invoice_id, date, desc, transaction_amt, occurrence). Unchanged rows are not
+        written, so created_on and the llm category survive re-ingestion; rows no
+        longer on the statement are removed.
+    """
+    # occurrence numbers identical lines within a statement (e.g. two coffees on one day)
+    occurrence = line_items.groupby(['date', 'desc', 'transaction_amt'], sort=False).cumcount()
+    res_balance = line_items['res_balance'].astype(object).where(line_items['res_balance'].notnull(), None)
+    adjusted_date = line_items['adjusted_date'].dt.strftime('%Y-%m-%d').astype(object)
+    adjusted_date = adjusted_date.where(adjusted_date.notnull(), None)
+
+    rows = list(zip(
+        line_items['invoice_id'].tolist(),
+        line_items['date'].tolist(),
+        line_items['desc'].tolist(),
+        line_items['transaction_amt'].astype(float).tolist(),
+        occurrence.tolist(),
+        res_balance.tolist(),
+        adjusted_date.tolist()
+    ))
+
+    cursor.executemany('''
+        INSERT INTO transactions
+        (invoice_id, date, desc, transaction_amt, occurrence, res_balance, adjusted_date,
+         created_on, modified_on)
+        VALUES (?, ?, ?, ?, ?, ?, ?, datetime('now', 'localtime'), datetime('now', 'localtime'))
+        ON CONFLICT(invoice_id, date, desc, transaction_amt, occurrence) DO UPDATE SET
+            res_balance=excluded.res_balance,
+            adjusted_date=excluded.adjusted_date,
+            modified_on=datetime('now', 'localtime')
+        WHERE res_balance IS NOT excluded.res_balance
+           OR adjusted_date IS NOT excluded.adjusted_date''', rows)
+
+    # drop rows for this invoice that are no longer parsed from the statement
+    invoice_id = rows[0][0]
+    parsed_keys = {row[1:5] for row in rows}
+    cursor.execute('''
+        SELECT id, date, desc, transaction_amt, occurrence
+        FROM transactions
+        WHERE invoice_id = ?
+    ''', (invoice_id,))
+    stale = [(row[0],) for row in cursor.fetchall() if row[1:] not in parsed_keys]
+    if stale:
+        cursor.executemany('DELETE FROM transactions WHERE id = ?', stale)
+
+def save_invoice_data(conn, bank_summary, card_summary, line_items) -> bool:
+    """Write one parsed invoice inside the open batch transaction. Returns True on success.
+        Each invoice gets its own savepoint so a failure only discards that invoice.
+    """
     cursor = conn.cursor()
     success = False  # Track if database operations succeed
+    if not conn.in_transaction:
+        cursor.execute('BEGIN')
+    cursor.execute('SAVEPOINT invoice')
     try:
         if not bank_summary.empty:
             # Convert values to proper types before insert
@@ -514,8 +476,8 @@ def extract_invoice_data(file_path):
                 (invoice_id, beginning_balance, ending_balance, deposits, withdrawals, 
                  date_start, date_end, account_number, created_on, modified_on)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, 
-                    COALESCE((SELECT created_on FROM bank_summary WHERE invoice_id = ?), CURRENT_TIMESTAMP),
-                    CURRENT_TIMESTAMP)
+                    COALESCE((SELECT created_on FROM bank_summary WHERE invoice_id = ?), datetime('now', 'localtime')),
+                    datetime('now', 'localtime'))
                 ON CONFLICT(invoice_id) DO UPDATE SET 
                     beginning_balance=excluded.beginning_balance,
                     ending_balance=excluded.ending_balance,
@@ -524,7 +486,7 @@ def extract_invoice_data(file_path):
                     date_start=excluded.date_start,
                     date_end=excluded.date_end,
                     account_number=excluded.account_number,
-                    modified_on=CURRENT_TIMESTAMP''', values)
+                    modified_on=datetime('now', 'localtime')''', values)
             
         if not card_summary.empty:
             # Convert values to proper types before insert
@@ -550,8 +512,8 @@ def extract_invoice_data(file_path):
                  date_end, cash_advances, balance_transfers, fees, interest, available_credit, credit_limit,
                  created_on, modified_on)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?,
-                    COALESCE((SELECT created_on FROM card_summary WHERE invoice_id = ?), CURRENT_TIMESTAMP),
-                    CURRENT_TIMESTAMP)
+                    COALESCE((SELECT created_on FROM card_summary WHERE invoice_id = ?), datetime('now', 'localtime')),
+                    datetime('now', 'localtime'))
                 ON CONFLICT(invoice_id) DO UPDATE SET 
                     card_number=excluded.card_number,
                     previous_balance=excluded.previous_balance,
@@ -564,7 +526,7 @@ def extract_invoice_data(file_path):
                     interest=excluded.interest,
                     available_credit=excluded.available_credit,
                     credit_limit=excluded.credit_limit,
-                    modified_on=CURRENT_TIMESTAMP''', values)
+                    modified_on=datetime('now', 'localtime')''', values)
 
         '''if not line_items.empty:
             # First delete existing transactions for this invoice_id
@@ -576,81 +538,174 @@ def extract_invoice_data(file_path):
             line_items.to_sql('transactions', conn, if_exists='append', index=False)'''
         
         if not line_items.empty:
-            # First delete existing transactions but preserve created_on dates
-            existing_created = {}
-            cursor.execute('''
-                SELECT invoice_id, date, desc, created_on 
-                FROM transactions 
-                WHERE invoice_id = ?
-            ''', (line_items['invoice_id'].iloc[0],))
-            
-            for row in cursor.fetchall():
-                key = (row[0], row[1], row[2])
-                existing_created[key] = row[3]
-
-            # Delete existing transactions
-            cursor.execute('DELETE FROM transactions WHERE invoice_id = ?', 
-                        (line_items['invoice_id'].iloc[0],))
-            
-            # Prepare transactions with proper timestamps
-            current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            values = []
-            for _, row in line_items.iterrows():
-                key = (row['invoice_id'], row['date'], row['desc'])
-                # Convert adjusted_date to string format
-                adjusted_date_str = row['adjusted_date'].strftime('%Y-%m-%d') if pd.notnull(row['adjusted_date']) else None
-                values.append((
-                    row['invoice_id'],
-                    row['date'],
-                    row['desc'],
-                    float(row['transaction_amt']),  # Ensure float type
-                    float(row['res_balance']) if pd.notnull(row['res_balance']) else None,  # Handle NaN
-                    adjusted_date_str,  # Use string format
-                    existing_created.get(key, current_time),
-                    current_time
-                ))
-            
-            # Insert with preserved created_on dates
-            cursor.executemany('''
-                INSERT INTO transactions 
-                (invoice_id, date, desc, transaction_amt, res_balance, adjusted_date, 
-                created_on, modified_on)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', values)
+            upsert_transactions(cursor, line_items)
             
-        conn.commit()
+        cursor.execute('RELEASE SAVEPOINT invoice')
         success = True  # Mark as successful if we get here
-    except sqlite3.IntegrityError:
-        # Handle duplicate invoice_id in summary table
-        if not bank_summary.empty:
-            bank_summary.to_sql('bank_summary', conn, if_exists='replace', index=False)
-        if not card_summary.empty:
-            card_summary.to_sql('card_summary', conn, if_exists='replace', index=False)
-        conn.commit()
-        success = True  # Mark as successful after handling duplicate
     except Exception as e:
-        logger.info(f"Error saving data to database: {e}")
-        conn.rollback()
+        # includes sqlite3.IntegrityError: duplicate invoice_ids are upserted above, so a
+        # constraint failure is a bad row; only this invoice is discarded, the batch stays open
+        logger.info(f"Error saving data to database: {e!r}")
+        cursor.execute('ROLLBACK TO SAVEPOINT invoice')
+        cursor.execute('RELEASE SAVEPOINT invoice')
         success = False  # Ensure failure is marked
-    finally:
-        conn.close()
 
-    # Only archive file if database operations succeeded
-    if success:
-        try:
-            dst_path = f"invoice_archive/{invoice_type}/{os.path.basename(file_path)}"
-            logger.info(f"Moving file to {dst_path}")
-            shutil.move(os.path.abspath(file_path), dst_path)
-        except Exception as e:
-            logger.info(f"Unable to archive file because: {e}")
-    else:
-        logger.info(f"File {file_path} not archived due to database errors")
+    return success
+
+def archive_invoice(file_path, invoice_type):
+    """Move a processed invoice into invoice_archive/"""
+    try:
+        dst_path = f"invoice_archive/{invoice_type}/{os.path.basename(file_path)}"
+        logger.info(f"Moving file to {dst_path}")
+        shutil.move(os.path.abspath(file_path), dst_path)
+    except Exception as e:
+        logger.info(f"Unable to archive file because: {e}")
+
+def file_hash(file_path) -> str:
+    """sha256 of the pdf bytes; identifies a statement regardless of file name"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def already_ingested(conn, content_hash, file_path) -> bool:
+    """Check the ledger before any page is read; archive re-dropped files that were already loaded"""
+    row = conn.execute('''
+        SELECT invoice_type, invoice_id FROM ingestion_ledger
+        WHERE content_hash = ? AND status = 'success'
+    ''', (content_hash,)).fetchone()
+    if row is None:
+        return False
+
+    logger.info(f"Skipping {file_path}: already ingested as invoice {row[1]}")
+    archive_invoice(file_path, row[0])
+    return True
+
+def record_ingestion(conn, content_hash, file_path, invoice_type, invoice_id, status, parse_seconds):
+    conn.execute('''
+        INSERT INTO ingestion_ledger
+        (content_hash, file_name, invoice_type, invoice_id, status, parse_seconds, created_on, modified_on)
+        VALUES (?, ?, ?, ?, ?, ?, datetime('now', 'localtime'), datetime('now', 'localtime'))
+        ON CONFLICT(content_hash) DO UPDATE SET
+            file_name=excluded.file_name,
+            invoice_type=excluded.invoice_type,
+            invoice_id=excluded.invoice_id,
+            status=excluded.status,
+            parse_seconds=excluded.parse_seconds,
+            modified_on=datetime('now', 'localtime')''',
+        (content_hash, os.path.basename(file_path), invoice_type, invoice_id, status, parse_seconds))
+
+def timed_parse(file_path, backend: str = PDF_BACKEND):
+    """parse_invoice plus its wall time in seconds"""
+    start = time.perf_counter()
+    parsed = parse_invoice(file_path, backend)
+    return parsed, time.perf_counter() - start
+
+def parsed_invoices(files: List[str], workers: int = 1, backend: str = PDF_BACKEND):
+    """Yield (file_path, parsed, parse_seconds), from a process pool when workers > 1.
+        A file that fails to parse (e.g. a corrupt pdf) is yielded with parsed=None, so it
+        gets an 'unparsed' ledger row and the files after it are still ingested.
+    """
+    if workers <= 1 or len(files) <= 1:
+        for file_path in files:
+            start = time.perf_counter()
+            try:
+                parsed, parse_seconds = timed_parse(file_path, backend)
+            except Exception as e:
+                logger.info(f"Error parsing {file_path}: {e}")
+                parsed, parse_seconds = None, time.perf_counter() - start
+            yield file_path, parsed, parse_seconds
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        start = time.perf_counter()
+        futures = {pool.submit(timed_parse, file_path, backend): file_path for file_path in files}
+        for future in as_completed(futures):
+            file_path = futures[future]
+            try:
+                parsed, parse_seconds = future.result()
+            except Exception as e:
+                logger.info(f"Error parsing {file_path}: {e}")
+                # the worker's own timing is lost with the exception; wall time since submit bounds it
+                parsed, parse_seconds = None, time.perf_counter() - start
+            yield file_path, parsed, parse_seconds
+
+def store_parsed_invoice(conn, file_path, content_hash, parsed, parse_seconds):
+    """Save a parsed invoice and its ledger row in the open transaction.
+        Returns the invoice type if saved, None otherwise.
+    """
+    if parsed is None:
+        record_ingestion(conn, content_hash, file_path, None, None, 'unparsed', parse_seconds)
+        return None
+
+    invoice_type, bank_summary, card_summary, line_items = parsed
+    summary = bank_summary if not bank_summary.empty else card_summary
+    invoice_id = str(summary['invoice_id'].iloc[0]) if not summary.empty else None
+
+    with records.span('db_write', file=os.path.basename(file_path), rows=len(line_items)) as span:
+        success = save_invoice_data(conn, bank_summary, card_summary, line_items)
+        span['saved'] = success
+    records.count('rows_parsed', len(line_items))
+    record_ingestion(conn, content_hash, file_path, invoice_type, invoice_id,
+                     'success' if success else 'failed', parse_seconds)
+    return invoice_type if success else None
+
+def commit_batch(conn, staged):
+    """Commit the open transaction, then archive its invoices.
+        staged: (file_path, invoice_type or None if the save failed)
+    """
+    with records.span('commit', files=len(staged)):
+        conn.commit()
+    for file_path, invoice_type in staged:
+        # Only archive file if database operations succeeded
+        if invoice_type:
+            archive_invoice(file_path, invoice_type)
+        else:
+            logger.info(f"File {file_path} not archived due to database errors")
+
+def ingest_files(files: List[str], workers: int = 1, batch_size: int = BATCH_SIZE, backend: str = PDF_BACKEND):
+    """Parse and store invoices, committing batch_size invoices per transaction.
+        With workers > 1, parsing runs in a process pool and this process stays the
+        only db writer. Files are archived only after the commit holding them succeeds.
+    """
+    conn = get_connection()
+    hashes = {}
+    for file_path in files:
+        content_hash = file_hash(file_path)
+        if not already_ingested(conn, content_hash, file_path):
+            hashes[file_path] = content_hash
+        else:
+            records.count('files_skipped')
+
+    staged = []
+    try:
+        for file_path, parsed, parse_seconds in parsed_invoices(list(hashes), workers, backend):
+            invoice_type = store_parsed_invoice(conn, file_path, hashes[file_path], parsed, parse_seconds)
+            records.count('files_saved' if invoice_type else 'files_failed')
+            records.count('parse_seconds', parse_seconds)
+            staged.append((file_path, invoice_type))
+            if len(staged) >= batch_size:
+                commit_batch(conn, staged)
+                staged = []
+        commit_batch(conn, staged)
+    except Exception:
+        # drop the uncommitted batch so a later commit on this connection (e.g. categorizing)
+        # cannot write 'success' ledger rows for files that were never archived
+        conn.rollback()
+        raise
+    records.emit_counters('ingest')
+
+def extract_invoice_data(file_path):
+    ingest_files([file_path])
 
 def update_table_schema(file_path: str):
     """Add category column if it doesn't exist.
         Initially created db without category column; now using llm to generate.
+        Also adds the occurrence column (natural key) and keeps TRANSACTION_INDEXES,
+        MONTHLY_TOTALS_TRIGGERS and TRANSACTION_FTS in place.
     """
-    conn = sqlite3.connect(file_path)
+    conn = get_connection(file_path)
     cursor = conn.cursor()
     
     # Check if category column exists
@@ -659,22 +714,105 @@ def update_table_schema(file_path: str):
     
     if 'category' not in columns:
         cursor.execute('ALTER TABLE transactions ADD COLUMN category TEXT')
-        conn.commit()
-    
-    conn.close()
-
-def get_uncategorized_transactions() -> pd.DataFrame:
-    """Get transactions without categories, use id to update later"""
-    conn = sqlite3.connect('finance_data.db')
-    query = """
-        SELECT id, desc
-        FROM transactions 
-        WHERE category IS NULL 
-        AND desc IS NOT NULL 
-        AND desc != ''
+
+    if 'occurrence' not in columns:
+        cursor.execute('ALTER TABLE transactions ADD COLUMN occurrence INTEGER NOT NULL DEFAULT 0')
+        # number existing duplicate lines within an invoice so the natural key is unique
+        cursor.execute('''
+            UPDATE transactions SET occurrence = numbered.n
+            FROM (
+                SELECT id, ROW_NUMBER() OVER (
+                    PARTITION BY invoice_id, date, desc, transaction_amt ORDER BY id) - 1 AS n
+                FROM transactions
+            ) AS numbered
+            WHERE numbered.id = transactions.id
+        ''')
+
+    for statement in TRANSACTION_INDEXES:
+        cursor.execute(statement)
+
+    # triggers reference category, so they come after the column; totals are backfilled once
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND name = 'transactions_totals_insert'")
+    backfill = cursor.fetchone() is None
+    for statement in MONTHLY_TOTALS_TRIGGERS:
+        cursor.execute(statement)
+    if backfill:
+        rebuild_monthly_totals(conn)
+        # summaries were upserted with CURRENT_TIMESTAMP (UTC) before this migration; all
+        # writes are local time now, so convert the old rows once, along with the backfill
+        for table in ('bank_summary', 'card_summary'):
+            cursor.execute(f"""UPDATE {table} SET created_on = datetime(created_on, 'localtime'),
+                                                  modified_on = datetime(modified_on, 'localtime')""")
+
+    # full-text index is filled from existing rows once, when first created
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'transactions_fts'")
+    backfill = cursor.fetchone() is None
+    for statement in TRANSACTION_FTS:
+        cursor.execute(statement)
+    if backfill:
+        cursor.execute("INSERT INTO transactions_fts (transactions_fts) VALUES ('rebuild')")
+    conn.commit()
+    cursor.execute('PRAGMA optimize')
+
+def rebuild_monthly_totals(conn):
+    """Recompute monthly_category_totals from transactions (not committed).
+        Only needed on first migration or to repair; the triggers keep it current otherwise.
+    """
+    conn.execute('DELETE FROM monthly_category_totals')
+    conn.execute('''
+        INSERT INTO monthly_category_totals
+        (month, category, total_amt, debit_amt, credit_amt, transaction_count, modified_on)
+        SELECT strftime('%Y-%m', adjusted_date), COALESCE(category, 'Uncategorized'),
+               ROUND(SUM(COALESCE(transaction_amt, 0)), 2),
+               ROUND(SUM(MIN(COALESCE(transaction_amt, 0), 0)), 2),
+               ROUND(SUM(MAX(COALESCE(transaction_amt, 0), 0)), 2),
+               COUNT(*), datetime('now', 'localtime')
+        FROM transactions
+        WHERE adjusted_date IS NOT NULL
+        GROUP BY 1, 2
+    ''')
+
+def fts_query(text: str) -> str:
+    """Search text to an FTS5 query: every word must start a token of desc, so 'amzn mktp'
+        becomes "amzn"* "mktp"*. Quoting keeps FTS5 operators and punctuation literal.
     """
+    words = text.split()
+    if not words:
+        raise ValueError('Empty search text')
+    return ' '.join('"' + word.replace('"', '""') + '"*' for word in words)
+
+def search_transactions(text: str, start: str = None, end: str = None, limit: int = None) -> pd.DataFrame:
+    """Transactions whose description matches text (e.g. a merchant), newest first, with
+        amounts, dates and categories. start/end bound adjusted_date ('YYYY-MM-DD', end exclusive).
+        Reads transactions_fts instead of scanning every desc with LIKE '%...%'.
+    """
+    sql = '''
+        SELECT t.id, t.adjusted_date, t.desc, t.transaction_amt, t.res_balance, t.category, t.invoice_id
+        FROM transactions_fts
+        JOIN transactions AS t ON t.id = transactions_fts.rowid
+        WHERE transactions_fts MATCH ?'''
+    params = [fts_query(text)]
+    if start:
+        sql += ' AND t.adjusted_date >= ?'
+        params.append(start)
+    if end:
+        sql += ' AND t.adjusted_date < ?'
+        params.append(end)
+    sql += ' ORDER BY t.adjusted_date DESC, t.id DESC'
+    if limit:
+        sql += ' LIMIT ?'
+        params.append(limit)
+    return pd.read_sql_query(sql, get_connection(), params=params)
+
+def get_uncategorized_transactions(include_staged: bool = False) -> pd.DataFrame:
+    """Get transactions without categories, use id to update later.
+        Rows that already have a staged proposal are left out unless include_staged.
+    """
+    conn = get_connection()
+    query = UNCATEGORIZED_QUERY
+    if not include_staged:
+        query += "AND id NOT IN (SELECT transaction_id FROM category_proposals)"
     df = pd.read_sql_query(query, conn)
-    conn.close()
     return df
 
 def get_categories() -> List[str]:
@@ -693,101 +831,479 @@ def get_categories() -> List[str]:
         "Other"
     ]
 
-def categorize_descriptions(descriptions: pd.DataFrame, categories: List[str]) -> Dict[str, str]:
-    """Use local LLM to categorize descriptions"""
-    categorized = {}
-    total = len(descriptions)
-    
-    for idx, row in descriptions.iterrows():
+async def categorize_single(row_id, description: str, categories: List[str], semaphore, timeout: float) -> str:
+    """One LLM call for one description; an answer outside categories becomes Other.
+        None if the request failed (timeout, connection error), so the row can be retried.
+    """
+    try:
+        # Get category from LLM
+        async with semaphore:
+            with records.span('llm_call', kind='single', rows=1):
+                records.count('llm_calls')
+                category = await asyncio.wait_for(acategorize_transaction(description, categories), timeout)
+    except Exception as e:
+        logger.info(f"Error categorizing '{description}' (ID: {row_id}): {e!r}")
+        records.count('llm_failures')
+        return None
+
+    # Validate result
+    return category.strip() if category.strip() in categories else "Other"
+
+async def categorize_batch(batch_ids: list, batch_descs: list, categories: List[str], semaphore,
+                           timeout: float) -> Dict[str, str]:
+    """One batch prompt. Items missing from the answer, or with a category not in categories,
+        fall back to one call each; so does the whole batch if the answer is not valid JSON.
+        Items whose fallback call failed are left out of the result.
+    """
+    answer = {}
+    if len(batch_ids) > 1:
         try:
-            # Get category from LLM
-            category = categorize_transaction(row['desc'], categories)
-            
-            # Validate and store result with transaction ID
-            if category.strip() in categories:
-                categorized[row['id']] = category.strip()
-            else:
-                categorized[row['id']] = "Other"
-                
+            async with semaphore:
+                with records.span('llm_call', kind='batch', rows=len(batch_ids)):
+                    records.count('llm_calls')
+                    answer = await asyncio.wait_for(acategorize_transactions_batch(batch_descs, categories), timeout)
         except Exception as e:
-            print(f"Error categorizing '{row['desc']}' (ID: {row['id']}): {e}")
-            categorized[row['id']] = "Other"
-    
+            logger.info(f"Malformed batch answer for ids {batch_ids[0]}..{batch_ids[-1]}, falling back per item: {e!r}")
+
+    categorized, fallback = {}, []
+    for i, (row_id, desc) in enumerate(zip(batch_ids, batch_descs), start=1):
+        category = answer.get(str(i))
+        if isinstance(category, str) and category.strip() in categories:
+            categorized[row_id] = category.strip()
+        else:
+            fallback.append((row_id, desc))
+
+    singles = await asyncio.gather(*(categorize_single(row_id, desc, categories, semaphore, timeout)
+                                     for row_id, desc in fallback))
+    categorized.update((row_id, category) for (row_id, desc), category in zip(fallback, singles)
+                       if category is not None)
     return categorized
 
-def save_categories(categorized: Dict[str, str]):
-    """Update database with new categories"""
-    conn = sqlite3.connect('finance_data.db')
-    cursor = conn.cursor()
-    
-    # Update categories by ID
-    cursor.executemany("""
-        UPDATE transactions 
-        SET category = ?,
-            modified_on = CURRENT_TIMESTAMP
-        WHERE id = ?
-    """, [(category, id) for id, category in categorized.items()])
-    
-    conn.commit()
-    conn.close()
-
-def review_categories(categorized: Dict[str, str]) -> pd.DataFrame:
-    """Convert results to DataFrame for review with descriptions"""
-    conn = sqlite3.connect('finance_data.db')
-    
-    # Get descriptions for the IDs
-    id_list = list(categorized.keys())
-    placeholders = ','.join('?' * len(id_list))
-    cursor = conn.cursor()
-    cursor.execute(f"SELECT id, desc FROM transactions WHERE id IN ({placeholders})", id_list)
-    descriptions = dict(cursor.fetchall())
-    
-    # Create review DataFrame with both description and category
-    df = pd.DataFrame({
-        'description': [descriptions[id] for id in categorized.keys()],
-        'category': list(categorized.values())
-    })
-    
-    conn.close()
-    return df
+async def llm_categorize_async(ids: list, descs: list, categories: List[str], batch_size: int,
+                               concurrency: int, timeout: float, on_batch=None) -> Dict[str, str]:
+    """Run all batches concurrently with at most `concurrency` requests in flight.
+        Progress is logged in rows/sec; results come back in the order of ids, without the
+        rows whose requests failed. on_batch(results) is called as each batch completes.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks = [categorize_batch(ids[start:start + batch_size], descs[start:start + batch_size], categories,
+                              semaphore, timeout)
+             for start in range(0, len(ids), batch_size)]
 
-def main():
-    create_tables() # create tables if they don't exist
-    #files = ['invoices/card/20250202-statements-0907-.pdf']
-    #files = ['invoices/bank/20250117-statements-3923-.pdf']
+    categorized = {}
+    rate = 0.0
+    start = time.perf_counter()
+    for task in asyncio.as_completed(tasks):
+        batch = await task
+        if on_batch is not None:
+            on_batch(batch)
+        categorized.update(batch)
+        rate = len(categorized) / (time.perf_counter() - start)
+        logger.info(f"Categorized {len(categorized)}/{len(ids)} rows ({rate:.1f} rows/sec)")
+
+    print(f"Categorized {len(categorized)} rows in {time.perf_counter() - start:.1f}s "
+          f"({rate:.1f} rows/sec, {concurrency} concurrent requests)")
+    if len(categorized) < len(ids):
+        logger.info(f"{len(ids) - len(categorized)} rows failed to categorize; they are retried on the next run")
+    return {row_id: categorized[row_id] for row_id in ids if row_id in categorized}
+
+def llm_categorize(ids: list, descs: list, categories: List[str], batch_size: int = CATEGORIZE_BATCH_SIZE,
+                   concurrency: int = CATEGORIZE_CONCURRENCY, timeout: float = CATEGORIZE_TIMEOUT,
+                   on_batch=None) -> Dict[str, str]:
+    """Categorize with the local LLM, batch_size descriptions per prompt"""
+    if not ids:
+        return {}
+    return get_llm_loop().run_until_complete(
+        llm_categorize_async(ids, descs, categories, batch_size, concurrency, timeout, on_batch))
+
+def get_llm_loop() -> asyncio.AbstractEventLoop:
+    """Process wide event loop for llm calls. The Ollama clients cached in utils/category_llm.py
+        stay bound to the loop they first ran on, so every llm_categorize (e.g. each watch batch)
+        has to reuse it rather than asyncio.run a new one.
+    """
+    global _llm_loop
+    if _llm_loop is None:
+        _llm_loop = asyncio.new_event_loop()
+        atexit.register(_llm_loop.close)
+    return _llm_loop
+
+def categorize_descriptions(descriptions: pd.DataFrame, categories: List[str],
+                            batch_size: int = CATEGORIZE_BATCH_SIZE,
+                            concurrency: int = CATEGORIZE_CONCURRENCY, run_id: str = None) -> Dict[str, str]:
+    """Use local LLM to categorize descriptions, after two cheaper tiers:
+        merchants with a confirmed category in merchant_categories are answered from the memo,
+        then a nearest neighbour classifier takes rows it is confident about. The LLM sees one
+        description per remaining merchant key.
+        With a run_id every answer is staged in category_proposals as soon as it is known.
+        Rows whose llm request failed get no category and are left out of the result.
+    """
+    memo = get_merchant_memo()
+    ids, descs = descriptions['id'].tolist(), descriptions['desc'].tolist()
+    keys = [normalize_merchant(desc) or desc for desc in descs]
+    categorized = {row_id: memo[key] for row_id, key in zip(ids, keys) if key in memo}
+
+    # second tier: nearest neighbours over already categorized transactions
+    rest = [(row_id, desc, key) for row_id, desc, key in zip(ids, descs, keys) if row_id not in categorized]
+    predicted, confidence = get_neighbour_categorizer().predict([desc for row_id, desc, key in rest])
+    neighbour_ids = set()
+    for (row_id, desc, key), category in zip(rest, predicted):
+        if category in categories:
+            categorized[row_id] = category
+            neighbour_ids.add(row_id)
+
+    # first row of every remaining merchant key goes to the llm
+    new_merchants = {}
+    for row_id, desc, key in rest:
+        if row_id not in categorized and key not in new_merchants:
+            new_merchants[key] = (row_id, desc)
+
+    total = max(len(ids), 1)
+    summary = (f"Categorizing {len(ids)} transactions: {len(categorized) - len(neighbour_ids)} from merchant memo, "
+               f"{len(neighbour_ids)} by nearest neighbours ({len(neighbour_ids) / total:.0%} of rows), "
+               f"{len(ids) - len(categorized)} via the llm ({len(new_merchants)} distinct merchants)")
+    print(summary)
+    logger.info(summary)
+    records.count('rows_memo', len(categorized) - len(neighbour_ids))
+    records.count('rows_neighbours', len(neighbour_ids))
+    records.count('rows_llm', len(ids) - len(categorized))
+
+    on_batch = None
+    if run_id is not None:
+        conn = get_connection()
+        stage_categories(conn, run_id, {i: c for i, c in categorized.items() if i not in neighbour_ids}, 'memo')
+        stage_categories(conn, run_id, {i: categorized[i] for i in neighbour_ids}, 'neighbours')
+        key_of = {row_id: key for key, (row_id, desc) in new_merchants.items()}
+        rows_by_key = {}
+        for row_id, desc, key in rest:
+            if row_id not in categorized:
+                rows_by_key.setdefault(key, []).append(row_id)
+        # every row of the merchant gets the answer for its representative. Only valid answers are
+        # staged: a row whose request failed stays unstaged, so the next run sends it again
+        on_batch = lambda batch: stage_categories(conn, run_id, {
+            row_id: category for rep_id, category in batch.items() if category in categories
+            for row_id in rows_by_key[key_of[rep_id]]}, 'llm')
+
+    with records.span('llm_categorize', rows=len(new_merchants)):
+        answers = llm_categorize([v[0] for v in new_merchants.values()], [v[1] for v in new_merchants.values()],
+                                 categories, batch_size, concurrency, on_batch=on_batch)
+    records.emit_counters('categorize')
+    llm_by_key = {key: answers[row_id] for key, (row_id, desc) in new_merchants.items() if row_id in answers}
+
+    results = {row_id: categorized[row_id] if row_id in categorized else llm_by_key[key]
+               for row_id, key in zip(ids, keys) if row_id in categorized or key in llm_by_key}
+    if len(results) < len(ids):
+        message = f"{len(ids) - len(results)} transactions left uncategorized after failed llm requests; the next run retries them"
+        print(message)
+        logger.info(message)
+    return results
+
+def get_neighbour_categorizer() -> NeighbourCategorizer:
+    """Process wide classifier, trained on categorized transactions on first use and
+        extended by approve_categories afterwards.
+    """
+    global _neighbour_categorizer
+    if _neighbour_categorizer is None:
+        _neighbour_categorizer = NeighbourCategorizer(threshold=NEIGHBOUR_THRESHOLD)
+        rows = get_connection().execute(
+            'SELECT desc, category FROM transactions WHERE category IS NOT NULL AND desc IS NOT NULL').fetchall()
+        _neighbour_categorizer.add([desc for desc, category in rows], [category for desc, category in rows])
+        logger.info(f"Nearest neighbour categorizer trained on {len(_neighbour_categorizer)} distinct rows")
+    return _neighbour_categorizer
+
+def get_merchant_memo() -> Dict[str, str]:
+    """Confirmed category per normalized merchant key"""
+    conn = get_connection()
+    return dict(conn.execute('SELECT merchant_key, category FROM merchant_categories').fetchall())
+
+def update_merchant_memo(conn, descs: List[str], categories: List[str]):
+    """Remember the confirmed category of each description's merchant key (not committed)"""
+    rows = [(key, category) for key, category in zip(map(normalize_merchant, descs), categories) if key]
+    conn.executemany('''
+        INSERT INTO merchant_categories (merchant_key, category, hits, created_on, modified_on)
+        VALUES (?, ?, 1, datetime('now', 'localtime'), datetime('now', 'localtime'))
+        ON CONFLICT(merchant_key) DO UPDATE SET
+            category=excluded.category,
+            hits=hits + 1,
+            modified_on=datetime('now', 'localtime')''', rows)
+
+def start_categorization_run(conn) -> str:
+    """Resume the run a crashed or interrupted process left 'running', else start a new one"""
+    row = conn.execute('''
+        SELECT run_id, (SELECT COUNT(*) FROM category_proposals p WHERE p.run_id = r.run_id)
+        FROM categorization_runs r WHERE status = 'running'
+        ORDER BY created_on DESC LIMIT 1''').fetchone()
+    if row is not None:
+        print(f"Resuming categorization run {row[0]} ({row[1]} proposals already staged)")
+        return row[0]
+
+    run_id = f"run_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
+    conn.execute('''
+        INSERT INTO categorization_runs (run_id, status, created_on, modified_on)
+        VALUES (?, 'running', datetime('now', 'localtime'), datetime('now', 'localtime'))''', (run_id,))
+    conn.commit()
+    return run_id
+
+def finish_categorization_run(conn, run_id):
+    conn.execute('''
+        UPDATE categorization_runs
+        SET status = 'staged',
+            proposals = (SELECT COUNT(*) FROM category_proposals WHERE run_id = ?),
+            modified_on = datetime('now', 'localtime')
+        WHERE run_id = ?''', (run_id, run_id))
+    conn.commit()
 
-    files = glob.glob('invoices/**/*.pdf')
-    for file_path in files:
-        extract_invoice_data(file_path) 
+def stage_categories(conn, run_id, categorized: Dict[int, str], source: str):
+    """Checkpoint proposals; committed right away so a crash never loses paid-for llm answers.
+        Only answers that were actually given belong here: a staged row is not sent to the llm again.
+    """
+    if not categorized:
+        return
+    conn.executemany('''
+        INSERT INTO category_proposals (transaction_id, run_id, category, source, created_on)
+        VALUES (?, ?, ?, ?, datetime('now', 'localtime'))
+        ON CONFLICT(transaction_id) DO UPDATE SET
+            run_id=excluded.run_id,
+            category=excluded.category,
+            source=excluded.source,
+            created_on=datetime('now', 'localtime')''',
+        [(row_id, run_id, category, source) for row_id, category in categorized.items()])
+    conn.commit()
 
-    update_table_schema('finance_data.db')
+def approve_categories(run_id: str = None) -> int:
+    """Promote staged proposals (all of them, or one run's) into transactions with one bulk
+        update, and remember them in the merchant memo and the neighbour classifier.
+        Returns the number of transactions updated.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    run_filter, params = ('AND p.run_id = ?', (run_id,)) if run_id else ('', ())
+
+    rows = cursor.execute(f'''
+        SELECT t.desc, p.category
+        FROM category_proposals p JOIN transactions t ON t.id = p.transaction_id
+        WHERE t.desc IS NOT NULL {run_filter}''', params).fetchall()
+
+    cursor.execute(f'''
+        UPDATE transactions
+        SET category = p.category,
+            modified_on = datetime('now', 'localtime')
+        FROM category_proposals AS p
+        WHERE p.transaction_id = transactions.id {run_filter}''', params)
+    updated = cursor.rowcount
+
+    # approved categories are confirmed -> future rows for the same merchant skip the llm
+    update_merchant_memo(conn, [desc for desc, category in rows], [category for desc, category in rows])
+    cursor.execute(f"DELETE FROM category_proposals AS p WHERE true {run_filter}", params)
+    cursor.execute('''
+        UPDATE categorization_runs SET status = 'approved', modified_on = datetime('now', 'localtime')
+        WHERE status = 'staged'
+          AND run_id NOT IN (SELECT run_id FROM category_proposals)''')
+    conn.commit()
 
-    # Get uncategorized transactions
+    if _neighbour_categorizer is not None:
+        _neighbour_categorizer.add([desc for desc, category in rows], [category for desc, category in rows])
+    return updated
+
+def review_categories(run_id: str = None) -> pd.DataFrame:
+    """Staged proposals with their descriptions, for review before approval"""
+    conn = get_connection()
+    run_filter, params = ('WHERE p.run_id = ?', (run_id,)) if run_id else ('', ())
+    return pd.read_sql_query(f'''
+        SELECT p.transaction_id AS id, t.desc AS description, p.category, p.source, p.run_id
+        FROM category_proposals p JOIN transactions t ON t.id = p.transaction_id
+        {run_filter}
+        ORDER BY p.transaction_id''', conn, params=params)
+
+def categorize_new_transactions(llm_concurrency: int = CATEGORIZE_CONCURRENCY, interactive: bool = True):
+    """Categorize uncategorized transactions into the staging table, then approve them if the
+        user agrees. Without a user to ask (watch mode) proposals stay staged for `approve`.
+    """
+    # Get uncategorized transactions that have no proposal yet
     descriptions = get_uncategorized_transactions()
-    if descriptions.empty:
+    if not descriptions.empty:
+        conn = get_connection()
+        run_id = start_categorization_run(conn)
+        categories = get_categories()
+        categorize_descriptions(descriptions, categories, concurrency=llm_concurrency, run_id=run_id)
+        finish_categorization_run(conn, run_id)
+
+    # Review everything still waiting for approval, including earlier runs
+    results = review_categories()
+    if results.empty:
         print("No uncategorized transactions found.")
         return
-        
-    categories = get_categories()
-    
-    # Categorize only new descriptions
-    categorized = categorize_descriptions(descriptions, categories)
-    
-    # Create DataFrame for review
-    results = review_categories(categorized)
     print("\nProposed categories for review:")
     logger.info(results)
     
     # Ask for confirmation
-    response = input("\nDo you want to save these categories? (y/n): ")
+    response = input("\nDo you want to save these categories? (y/n): ") if interactive else 'n'
     if response.lower() == 'y':
-        save_categories(categorized)
+        approve_categories()
         print("Categories saved to database.")
     else:
-        print("Categories not saved.")
+        print(f"Categories not saved; {len(results)} proposals stay staged. Approve later with `python invoiceParser.py approve`.")
         results.to_csv('pending_categories.csv')
         print("Categories exported to pending_categories.csv for manual review.")
 
+def approve(run_id: str = None):
+    """Separate approval step for staged proposals (e.g. after reviewing pending_categories.csv)"""
+    create_tables()
+    update_table_schema('finance_data.db')
+    updated = approve_categories(run_id)
+    logger.info(f"Approved {updated} staged categories" + (f" from {run_id}" if run_id else ''))
+    print(f"Approved {updated} staged categories.")
+
+def ingest(workers: int = 1, batch_size: int = BATCH_SIZE, pdf_backend: str = PDF_BACKEND):
+    """Parse every pdf under invoices/ into the database; no categorization"""
+    create_tables() # create tables if they don't exist
+    update_table_schema('finance_data.db')  # natural key is needed before ingesting
+    #files = ['invoices/card/20250202-statements-0907-.pdf']
+    #files = ['invoices/bank/20250117-statements-3923-.pdf']
+
+    files = glob.glob('invoices/**/*.pdf')
+    ingest_files(files, workers=workers, batch_size=batch_size, backend=pdf_backend)
+
+def categorize(llm_concurrency: int = CATEGORIZE_CONCURRENCY, interactive: bool = True):
+    """Stage categories for uncategorized transactions and offer to approve them"""
+    create_tables()
+    update_table_schema('finance_data.db')
+    categorize_new_transactions(llm_concurrency, interactive=interactive)
+
+def main(workers: int = 1, batch_size: int = BATCH_SIZE, llm_concurrency: int = CATEGORIZE_CONCURRENCY,
+         pdf_backend: str = PDF_BACKEND):
+    ingest(workers=workers, batch_size=batch_size, pdf_backend=pdf_backend)
+    categorize_new_transactions(llm_concurrency)
+
+def export(out_dir: str = EXPORT_DIR, full: bool = False):
+    """Write transactions and the summary tables to Parquet, partitioned by year and month"""
+    create_tables()
+    update_table_schema('finance_data.db')
+    with records.span('export', out_dir=out_dir, full=full) as span:
+        written = export_parquet(get_connection(), out_dir, full=full)
+        span.update(written)
+    logger.info(f"Exported to {out_dir}: {written}")
+    print(f"Exported to {out_dir}: " + ', '.join(f"{table} {n} partition(s)" for table, n in written.items()))
+
+def search(text: str, start: str = None, end: str = None, limit: int = None):
+    """Print the transactions matching a merchant search"""
+    create_tables()
+    update_table_schema('finance_data.db')
+    with records.span('search', query=text) as span:
+        results = search_transactions(text, start=start, end=end, limit=limit)
+        span['rows'] = len(results)
+    if results.empty:
+        print("No matching transactions found.")
+        return
+    print(results.to_string(index=False))
+    print(f"\n{len(results)} transaction(s), total {results['transaction_amt'].sum():,.2f}")
+
+def watch(workers: int = 1, batch_size: int = BATCH_SIZE, llm_concurrency: int = CATEGORIZE_CONCURRENCY,
+          pdf_backend: str = PDF_BACKEND, settle: float = WATCH_SETTLE, poll_interval: float = WATCH_POLL_INTERVAL):
+    """Service mode: ingest statements as they land in WATCH_FOLDERS, categorizing after each batch.
+        Runs until interrupted (Ctrl+C or SIGTERM).
+    """
+    create_tables()
+    update_table_schema('finance_data.db')
+    work = queue.Queue()
+    watcher = FolderWatcher(WATCH_FOLDERS, settle=settle, poll_interval=poll_interval)
+    watcher.start(work)  # files already waiting are queued first
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    logger.info(f"Watching {', '.join(WATCH_FOLDERS)} ({watcher.mode})")
+    print(f"Watching {', '.join(WATCH_FOLDERS)} for new statements ({watcher.mode}). Ctrl+C to stop.")
+
+    try:
+        while True:
+            # block for the first file, then take whatever else is ready as the same batch
+            batch = [work.get()]
+            while len(batch) < batch_size:
+                try:
+                    batch.append(work.get_nowait())
+                except queue.Empty:
+                    break
+            logger.info(f"Ingesting batch of {len(batch)} file(s)")
+            try:
+                ingest_files(batch, workers=workers, batch_size=batch_size, backend=pdf_backend)
+                categorize_new_transactions(llm_concurrency, interactive=False)
+            except Exception as e:  # keep the service up; the failed batch is rolled back, its files stay in place
+                get_connection().rollback()
+                logger.info(f"Error processing batch: {e}")
+    except KeyboardInterrupt:
+        print("Stopping watcher.")
+    finally:
+        watcher.stop()
+
+COMMANDS = ['run', 'ingest', 'categorize', 'approve', 'export', 'search', 'watch']
+
+def cli(argv: List[str] = None):
+    """Command line entry point. Each subcommand only touches the code (and so the lazily
+        imported libraries: pdf backends, sklearn, langchain, pyarrow, watchdog) it needs.
+        Without a subcommand it runs `run`, so `python invoiceParser.py -w 4` still works.
+    """
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or (argv[0] not in COMMANDS and argv[0] not in ('-h', '--help')):
+        argv = ['run'] + argv
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--debug', action='store_true',
+                        help='also log every parsed summary and line item table (slow on large statements)')
+    ingest_opts = argparse.ArgumentParser(add_help=False)
+    ingest_opts.add_argument('-w', '--workers', type=int, default=1,
+                             help='number of processes used to parse pdfs (default: 1, sequential)')
+    ingest_opts.add_argument('-b', '--batch-size', type=int, default=BATCH_SIZE,
+                             help=f'invoices committed per transaction (default: {BATCH_SIZE})')
+    ingest_opts.add_argument('--pdf-backend', choices=sorted(BACKENDS), default=PDF_BACKEND,
+                             help=f'pdf text extractor (default: {PDF_BACKEND})')
+    categorize_opts = argparse.ArgumentParser(add_help=False)
+    categorize_opts.add_argument('-c', '--llm-concurrency', type=int, default=CATEGORIZE_CONCURRENCY,
+                                 help=f'concurrent categorization requests to Ollama (default: {CATEGORIZE_CONCURRENCY})')
+
+    parser = argparse.ArgumentParser(description='Parse invoices into finance_data.db and categorize transactions')
+    commands = parser.add_subparsers(dest='command', metavar='command')
+    commands.add_parser('run', parents=[common, ingest_opts, categorize_opts],
+                        help='ingest new pdfs, then categorize (default)')
+    commands.add_parser('ingest', parents=[common, ingest_opts], help='parse pdfs under invoices/ only')
+    categorize_cmd = commands.add_parser('categorize', parents=[common, categorize_opts],
+                                         help='stage categories for uncategorized transactions')
+    categorize_cmd.add_argument('--no-review', action='store_true',
+                                help='stage proposals without the y/n prompt (approve them later)')
+    approve_cmd = commands.add_parser('approve', parents=[common], help='promote staged category proposals')
+    approve_cmd.add_argument('run_id', nargs='?', help='only this categorization run (default: all staged)')
+    export_cmd = commands.add_parser('export', parents=[common],
+                                     help='write tables to Parquet, only partitions changed since the last export')
+    export_cmd.add_argument('out_dir', nargs='?', default=EXPORT_DIR, help=f'output directory (default: {EXPORT_DIR})')
+    export_cmd.add_argument('--full', action='store_true', help='rewrite every partition')
+    search_cmd = commands.add_parser('search', parents=[common], help='find transactions by description, e.g. a merchant')
+    search_cmd.add_argument('text', nargs='+', help='words that must start a word of the description (AMZN, whole foods)')
+    search_cmd.add_argument('--start', help='first adjusted date, YYYY-MM-DD')
+    search_cmd.add_argument('--end', help='adjusted dates before this one, YYYY-MM-DD')
+    search_cmd.add_argument('--limit', type=int, help='newest rows only')
+    watch_cmd = commands.add_parser('watch', parents=[common, ingest_opts, categorize_opts],
+                                    help=f"keep running and ingest new pdfs in {' and '.join(WATCH_FOLDERS)} as they arrive")
+    watch_cmd.add_argument('--settle', type=float, default=WATCH_SETTLE,
+                           help=f'seconds a pdf must stay unchanged before parsing (default: {WATCH_SETTLE})')
+    watch_cmd.add_argument('--poll-interval', type=float, default=WATCH_POLL_INTERVAL,
+                           help=f'seconds between scans when watchdog is not installed (default: {WATCH_POLL_INTERVAL})')
+    args = parser.parse_args(argv)
+    if args.debug:
+        logger.setLevel(logging.DEBUG)
+
+    logger.info(f"======================== Version \t{__version__}\t======================== {args.command}")
+    if args.command == 'ingest':
+        ingest(workers=args.workers, batch_size=args.batch_size, pdf_backend=args.pdf_backend)
+    elif args.command == 'categorize':
+        categorize(llm_concurrency=args.llm_concurrency, interactive=not args.no_review)
+    elif args.command == 'approve':
+        approve(args.run_id)
+    elif args.command == 'export':
+        export(args.out_dir, full=args.full)
+    elif args.command == 'search':
+        search(' '.join(args.text), start=args.start, end=args.end, limit=args.limit)
+    elif args.command == 'watch':
+        watch(workers=args.workers, batch_size=args.batch_size, llm_concurrency=args.llm_concurrency,
+              pdf_backend=args.pdf_backend, settle=args.settle, poll_interval=args.poll_interval)
+    else:
+        main(workers=args.workers, batch_size=args.batch_size, llm_concurrency=args.llm_concurrency,
+             pdf_backend=args.pdf_backend)
+
 if __name__ == '__main__':
-    logger.info(f"======================== Version \t{__version__}\t========================")
-    main()
\ No newline at end of file
+    cli()
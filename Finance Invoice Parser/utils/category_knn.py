@@ -0,0 +1,86 @@
+import numpy as np
+from utils.merchants import normalize_merchant
+
+class NeighbourCategorizer:
+    """First-tier categorizer: TF-IDF character n-grams of a description's merchant key +
+        cosine nearest neighbours over already categorized transactions.
+
+        Descriptions are reduced to normalize_merchant() keys (no dates, store or card numbers),
+        hashed into char 3-5 gram counts, then idf weighted, so boilerplate every statement line
+        shares ("CARD PURCHASE ... CARD") counts for little. Hashing needs no vocabulary; the idf
+        weights are refit from the stored counts on add().
+        Only neighbours with similarity >= min_similarity vote, and a category needs min_votes of
+        them; confidence = (its share of their similarity) x (similarity of its closest neighbour).
+        An unseen merchant rarely has two close neighbours (one sharing its city is not enough),
+        so it goes to the llm. See benchmarks/bench_neighbours.py.
+    """
+
+    def __init__(self, n_neighbors: int = 5, threshold: float = 0.5, min_similarity: float = 0.4,
+                 min_votes: int = 2):
+        from sklearn.feature_extraction.text import HashingVectorizer  # sklearn/scipy load only when categorizing
+        self.n_neighbors = n_neighbors
+        self.threshold = threshold
+        self.min_similarity = min_similarity
+        self.min_votes = min_votes
+        self.vectorizer = HashingVectorizer(analyzer='char_wb', ngram_range=(3, 5), n_features=2 ** 18,
+                                            alternate_sign=False, norm=None, lowercase=True)
+        self.counts = None  # raw n-gram counts of every labelled key, idf is refit from these
+        self.tfidf = None
+        self.X = None
+        self.labels = np.array([], dtype=object)
+        self._seen = set()
+        self._nn = None
+
+    def __len__(self):
+        return len(self.labels)
+
+    def _keys(self, descriptions: list) -> list:
+        return [normalize_merchant(d) or d for d in descriptions]
+
+    def add(self, descriptions: list, categories: list):
+        """Append labelled descriptions; duplicates of (merchant key, category) are ignored"""
+        new = [(k, c) for k, c in zip(self._keys([d or '' for d in descriptions]), categories)
+               if k and c and (k, c) not in self._seen]
+        new = list(dict.fromkeys(new))
+        if not new:
+            return
+        self._seen.update(new)
+        import scipy.sparse as sp
+        from sklearn.feature_extraction.text import TfidfTransformer
+        from sklearn.neighbors import NearestNeighbors
+
+        counts = self.vectorizer.transform([k for k, c in new])
+        self.counts = counts if self.counts is None else sp.vstack([self.counts, counts], format='csr')
+        self.labels = np.concatenate([self.labels, np.array([c for k, c in new], dtype=object)])
+        self.tfidf = TfidfTransformer(sublinear_tf=True).fit(self.counts)
+        self.X = self.tfidf.transform(self.counts)
+        # brute force cosine search just keeps a reference to X, so refitting is cheap
+        self._nn = NearestNeighbors(n_neighbors=min(self.n_neighbors, len(self.labels)),
+                                    metric='cosine', algorithm='brute').fit(self.X)
+
+    def predict(self, descriptions: list):
+        """Return (categories, confidences); category is None when confidence < threshold"""
+        if self._nn is None or not descriptions:
+            return [None] * len(descriptions), np.zeros(len(descriptions))
+
+        X = self.tfidf.transform(self.vectorizer.transform(self._keys(descriptions)))
+        distances, indices = self._nn.kneighbors(X)
+        similarities = 1 - distances
+
+        predictions, confidences = [], np.zeros(len(descriptions))
+        for row, (sims, idx) in enumerate(zip(similarities, indices)):
+            votes, closest, voters = {}, {}, {}
+            for sim, label in zip(sims, self.labels[idx]):
+                if sim < self.min_similarity:
+                    continue
+                votes[label] = votes.get(label, 0.0) + sim
+                closest[label] = max(closest.get(label, 0.0), sim)
+                voters[label] = voters.get(label, 0) + 1
+            if not votes:
+                predictions.append(None)
+                continue
+            label, mass = max(votes.items(), key=lambda item: item[1])
+            if voters[label] >= self.min_votes:
+                confidences[row] = (mass / sum(votes.values())) * closest[label]
+            predictions.append(label if confidences[row] >= self.threshold else None)
+        return predictions, confidences
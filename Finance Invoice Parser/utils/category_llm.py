@@ -1,15 +1,13 @@
-from langchain_core.prompts import SystemMessagePromptTemplate, HumanMessagePromptTemplate, ChatPromptTemplate
-from langchain_ollama import ChatOllama
-from langchain_core.output_parsers import StrOutputParser
+from functools import lru_cache
+
 base_url = 'http://localhost:11434'
 model = 'llama3.2'
-llm = ChatOllama(base_url=base_url, model=model)
 
-system = SystemMessagePromptTemplate.from_template("""
+system_prompt = """
     You are a financial transaction categorizer. Your task is to analyze transaction descriptions 
     and assign them to the most appropriate category from the provided list.
     You should be consistent in your categorization and focus on the primary purpose of the transaction.
-""")
+"""
 
 categorize_prompt = """
     Categorize this transaction description into EXACTLY ONE of these categories:
@@ -23,18 +21,96 @@ categorize_prompt = """
     Transaction Description: {description}
 """
 
-prompt = HumanMessagePromptTemplate.from_template(categorize_prompt)
-messages = [system, prompt]
-template = ChatPromptTemplate(messages=messages)
+batch_categorize_prompt = """
+    Categorize each transaction description below into EXACTLY ONE of these categories:
+    {categories}
+
+    Rules:
+    - Choose exactly one category for every transaction
+    - Respond ONLY with a JSON object mapping each transaction number to its category name,
+      for example {{"1": "Groceries", "2": "Other"}}
+    - If unsure, use 'Other'
+
+    Transactions:
+    {transactions}
+"""
+
+@lru_cache(maxsize=None)
+def _chains() -> dict:
+    """Build the Ollama clients and prompt chains on first use; importing langchain
+        costs more than the whole ingest path, so it only happens when categorizing.
+    """
+    from langchain_core.prompts import SystemMessagePromptTemplate, HumanMessagePromptTemplate, ChatPromptTemplate
+    from langchain_ollama import ChatOllama
+    from langchain_core.output_parsers import StrOutputParser, JsonOutputParser
+
+    llm = ChatOllama(base_url=base_url, model=model)
+    json_llm = ChatOllama(base_url=base_url, model=model, format='json')
+    system = SystemMessagePromptTemplate.from_template(system_prompt)
+
+    prompt = HumanMessagePromptTemplate.from_template(categorize_prompt)
+    messages = [system, prompt]
+    template = ChatPromptTemplate(messages=messages)
+
+    batch_prompt = HumanMessagePromptTemplate.from_template(batch_categorize_prompt)
+    batch_template = ChatPromptTemplate(messages=[system, batch_prompt])
+
+    return {
+        'llm': llm,
+        'json_llm': json_llm,
+        'system': system,
+        'prompt': prompt,
+        'template': template,
+        'batch_prompt': batch_prompt,
+        'batch_template': batch_template,
+        'categorize_chain': template | llm | StrOutputParser(),
+        'batch_categorize_chain': batch_template | json_llm | JsonOutputParser(),
+    }
 
-categorize_chain = template | llm | StrOutputParser()
+def __getattr__(name):
+    # llm, categorize_chain, batch_categorize_chain, ... stay importable as module attributes
+    if not name.startswith('__') and name in _chains():
+        return _chains()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def _single_input(description: str, categories: list) -> dict:
+    return {
+        "description": description,
+        "categories": ", ".join(categories)
+    }
+
+def _batch_input(descriptions: list, categories: list) -> dict:
+    return {
+        "transactions": "\n".join(f"{i}: {description}" for i, description in enumerate(descriptions, start=1)),
+        "categories": ", ".join(categories)
+    }
+
+def _batch_answer(result) -> dict:
+    if not isinstance(result, dict):
+        raise ValueError(f"Expected a JSON object, got {type(result).__name__}")
+    return {str(k).strip(): v for k, v in result.items()}
 
 def categorize_transaction(description: str, categories: list) -> str:
     """
     Categorize a single transaction description
     """
-    categories_str = ", ".join(categories)
-    return categorize_chain.invoke({
-        "description": description,
-        "categories": categories_str
-    })
\ No newline at end of file
+    return _chains()['categorize_chain'].invoke(_single_input(description, categories))
+
+def categorize_transactions_batch(descriptions: list, categories: list) -> dict:
+    """
+    Categorize several transaction descriptions in one prompt.
+    Returns the model's mapping of 1-based position (as str) to category, unvalidated
+    """
+    return _batch_answer(_chains()['batch_categorize_chain'].invoke(_batch_input(descriptions, categories)))
+
+async def acategorize_transaction(description: str, categories: list) -> str:
+    """
+    Async categorize_transaction, lets several requests share Ollama's parallel slots
+    """
+    return await _chains()['categorize_chain'].ainvoke(_single_input(description, categories))
+
+async def acategorize_transactions_batch(descriptions: list, categories: list) -> dict:
+    """
+    Async categorize_transactions_batch
+    """
+    return _batch_answer(await _chains()['batch_categorize_chain'].ainvoke(_batch_input(descriptions, categories)))
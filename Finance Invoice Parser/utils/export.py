@@ -0,0 +1,128 @@
+import os, shutil
+from pathlib import Path
+import pandas as pd
+
+# table -> date column it is partitioned on (year=YYYY/month=MM, hive style)
+EXPORT_TABLES = {
+    'transactions': 'adjusted_date',
+    'bank_summary': 'date_start',
+    'card_summary': 'date_start',
+}
+NULL_PARTITION = '__HIVE_DEFAULT_PARTITION__'  # pyarrow reads this back as null
+
+def _partition_dir(root: Path, year, month) -> Path:
+    return root / f"year={year or NULL_PARTITION}" / f"month={month or NULL_PARTITION}"
+
+def _partition_rows(conn, table, column, year, month) -> pd.DataFrame:
+    """One partition's rows; a date range rather than strftime so the column's index is used"""
+    if year is None:
+        return pd.read_sql_query(f'SELECT * FROM {table} WHERE {column} IS NULL', conn)
+    start = f"{year}-{month}-01"
+    end = f"{int(year) + (month == '12')}-{int(month) % 12 + 1:02d}-01"
+    return pd.read_sql_query(f'SELECT * FROM {table} WHERE {column} >= ? AND {column} < ?', conn,
+                             params=(start, end))
+
+def _column_type(declared: str):
+    """Arrow type for a SQLite declared column type (DATE/DATETIME, then SQLite's affinity rules)"""
+    import pyarrow as pa
+    declared = declared.upper()
+    if 'DATE' in declared or 'TIME' in declared:
+        return pa.timestamp('ns')
+    if 'INT' in declared:
+        return pa.int64()
+    if any(name in declared for name in ('REAL', 'FLOA', 'DOUB', 'NUM', 'DEC')):
+        return pa.float64()
+    return pa.string()
+
+def _table_schema(conn, table):
+    """One parquet schema per table from its declared column types, used for every partition;
+        left to pandas, a month with no categorized rows yet would write category as null and
+        the partitions could not be read back as one dataset
+    """
+    import pyarrow as pa
+    return pa.schema([(name, _column_type(declared or ''))
+                      for _, name, declared, *_ in conn.execute(f'PRAGMA table_info({table})')])
+
+def _write_partition(df: pd.DataFrame, directory: Path, schema):
+    """Replace the partition's file atomically so readers never see half a partition"""
+    import pyarrow as pa
+    directory.mkdir(parents=True, exist_ok=True)
+    for field in schema:
+        if field.type == pa.timestamp('ns'):
+            df[field.name] = pd.to_datetime(df[field.name], errors='coerce')
+        elif field.type == pa.int64():
+            df[field.name] = df[field.name].astype('Int64')  # nullable, a NULL would make it float
+    tmp = directory / '.part-0.parquet.tmp'
+    df.to_parquet(tmp, index=False, schema=schema)
+    os.replace(tmp, directory / 'part-0.parquet')
+
+def _touched_partitions(conn, table, column, since, slack: int = 0):
+    """(year, month) of rows modified since the last export. For transactions also the months
+        whose monthly_category_totals row changed, which catches deleted and re-dated rows.
+        modified_on is local time; slack is how many seconds the clock went back since then (end
+        of daylight saving time), so rows written in the repeated hour are not missed.
+    """
+    sql = f'''
+        SELECT DISTINCT strftime('%Y', {column}), strftime('%m', {column})
+        FROM {table} WHERE modified_on >= datetime(?, ?)'''
+    params = [since, f'-{slack} seconds']
+    if table == 'transactions':
+        sql += '''
+        UNION
+        SELECT DISTINCT substr(month, 1, 4), substr(month, 6, 2)
+        FROM monthly_category_totals WHERE modified_on >= datetime(?, ?)'''
+        params += [since, f'-{slack} seconds']
+    return set(conn.execute(sql, params).fetchall())
+
+def export_parquet(conn, out_dir: str, full: bool = False) -> dict:
+    """Write EXPORT_TABLES to out_dir/<table>/year=YYYY/month=MM/part-0.parquet.
+
+        Only partitions touched since the previous export to the same out_dir are rewritten
+        (tracked in parquet_exports by modified_on); partitions with no rows left are removed.
+        full=True rewrites everything. Returns {table: partitions written}.
+    """
+    out = Path(out_dir).resolve()
+    # taken before reading, so rows modified during the export are picked up next time; the
+    # utc offset (seconds) it was taken at tells the next export whether the clock went back
+    watermark, utc_offset = conn.execute("""
+        SELECT datetime('now', 'localtime'),
+               CAST(strftime('%s', 'now', 'localtime') AS INTEGER) - CAST(strftime('%s', 'now') AS INTEGER)
+    """).fetchone()
+    written = {}
+    for table, column in EXPORT_TABLES.items():
+        root = out / table
+        schema = _table_schema(conn, table)
+        row = conn.execute('SELECT exported_through, utc_offset FROM parquet_exports '
+                           'WHERE out_dir = ? AND table_name = ?', (str(out), table)).fetchone()
+        existing = set(conn.execute(
+            f"SELECT DISTINCT strftime('%Y', {column}), strftime('%m', {column}) FROM {table}").fetchall())
+        if full or row is None or not root.exists():
+            touched = existing
+        else:
+            slack = max(row[1] - utc_offset, 0) if row[1] is not None else 0
+            touched = _touched_partitions(conn, table, column, row[0], slack) & existing
+
+        for year, month in sorted(touched, key=str):
+            _write_partition(_partition_rows(conn, table, column, year, month), _partition_dir(root, year, month),
+                             schema)
+
+        # drop partitions whose rows are all gone
+        keep = {_partition_dir(root, year, month) for year, month in existing}
+        for directory in root.glob('year=*/month=*'):
+            if directory not in keep:
+                shutil.rmtree(directory)
+                if not any(directory.parent.iterdir()):
+                    directory.parent.rmdir()
+
+        conn.execute('''
+            INSERT INTO parquet_exports
+            (out_dir, table_name, exported_through, utc_offset, partitions_written, exported_on)
+            VALUES (?, ?, ?, ?, ?, datetime('now', 'localtime'))
+            ON CONFLICT(out_dir, table_name) DO UPDATE SET
+                exported_through=excluded.exported_through,
+                utc_offset=excluded.utc_offset,
+                partitions_written=excluded.partitions_written,
+                exported_on=datetime('now', 'localtime')''', (str(out), table, watermark, utc_offset, len(touched)))
+        written[table] = len(touched)
+    conn.commit()
+    return written
@@ -0,0 +1,137 @@
+import re
+
+DATE = re.compile(r'\d{2}/\d{2}')
+WHITESPACE = re.compile(r'\s+')
+
+class LineRule:
+    """One transaction line layout: a MM/DD date, a free text description, then amount tokens
+        at the end of the line. Reads the same fields as `pattern` did over the whole page text.
+
+        The trailing tokens are matched once, anchored, on the reversed line; the description is
+        what lies between the first usable date and them. So a line costs O(length) no matter how
+        many dates, dashes or numbers its description holds. Matches no longer span line breaks.
+    """
+    columns = ()
+    pattern = ''  # regex this rule replaces (benchmarks/bench_tokenizer.py checks they agree)
+    tail = None  # trailing tokens, reversed; matched at the start of the reversed line
+
+    def __init__(self, skip_dashed: bool = False):
+        self.skip_dashed = skip_dashed  # no '-' allowed after the date, like (?!.*-)
+
+    def desc_ends(self, line, tail):
+        """[(first, last, values)] ranges where the description may end, in order, with the
+            amount fields that follow a description ending there
+        """
+        raise NotImplementedError
+
+    def match(self, line, rev):
+        """Tuple of column values, None if the line is not this layout"""
+        tail = self.tail.match(rev)
+        if tail is None:
+            return None
+        ends = self.desc_ends(line, tail)
+        if not ends:
+            return None
+        last_dash = line.rfind('-') if self.skip_dashed else -1
+        stop = ends[-1][1]  # dates past the last possible description end cannot start a match
+        if last_dash >= stop:
+            return None
+
+        # every date is a candidate start, left to right, as with finditer; one before the
+        # last dash would fail the lookahead anyway
+        date = DATE.search(line, last_dash + 1, stop)
+        while date is not None:
+            gap = WHITESPACE.match(line, date.end())
+            if gap is not None and gap.end() > last_dash:
+                start = gap.end()
+                for first, last, values in ends:
+                    if last >= start:  # shortest description, as with the lazy .*?
+                        return (date.group(), line[start:max(first, start)], *values)
+                # the date's whitespace runs into the amounts: the description is empty
+                first, last, values = ends[-1]
+                if last > date.end():
+                    return (date.group(), '', *values)
+            date = DATE.search(line, date.start() + 1, stop)
+        return None
+
+class AmountBalanceLine(LineRule):
+    """date, desc, amount (optionally '-' and spaced), running balance"""
+    columns = ('date', 'desc', 'amt', 'bal')
+    pattern = r'(?P<date>\d{2}\/\d{2})\s+(?P<desc>.*?)\s+(?P<amt>\-?\s*[\d,]+\.\d{2})\s+(?P<bal>[\d,.]+)\n'
+    tail = re.compile(r'(?P<bal>[\d,.]+)(?P<gap>\s+)\d{2}\.(?P<int>[\d,]+)(?P<space>\s*)(?:(?P<dash>-)(?P<lead>\s*))?')
+
+    def desc_ends(self, line, tail):
+        bal_start = len(line) - len(tail['bal'])
+        amt_end = bal_start - len(tail['gap'])
+        digits = amt_end - 3 - len(tail['int'])
+        spaced = digits - len(tail['space'])
+        ends = []
+        if tail['dash']:
+            dash = spaced - 1
+            if tail['lead']:  # ' -12.00' or ' - 12.00': the dash belongs to the amount
+                ends.append((dash - len(tail['lead']), dash - 1, (line[dash:amt_end], tail['bal'][::-1])))
+        if spaced < digits:
+            ends.append((spaced, digits - 1, (line[digits:amt_end], tail['bal'][::-1])))
+        return ends
+
+class BalanceLine(LineRule):
+    """date, desc, running balance; the amount is read elsewhere (amount_block)"""
+    columns = ('date', 'desc', 'bal')
+    pattern = r'(?P<date>\d{2}\/\d{2})\s+(?!.*-)(?P<desc>.*?)\s+(?P<bal>[\d,.]+)\n'
+    tail = re.compile(r'(?P<bal>[\d,.]+)(?P<gap>\s+)')
+
+    def desc_ends(self, line, tail):
+        bal_start = len(line) - len(tail['bal'])
+        return [(bal_start - len(tail['gap']), bal_start - 1, (tail['bal'][::-1],))]
+
+class AmountLine(LineRule):
+    """date, desc, signed amount"""
+    columns = ('date', 'desc', 'amt')
+    pattern = r'(?P<date>\d{2}\/\d{2})\s+(?P<desc>.*?)\s+(?P<amt>\-?[\d,.]+)\n'
+    tail = re.compile(r'(?P<amt>[\d,.]+-?)(?P<gap>\s+)')
+
+    def desc_ends(self, line, tail):
+        amt_start = len(line) - len(tail['amt'])
+        return [(amt_start - len(tail['gap']), amt_start - 1, (tail['amt'][::-1],))]
+
+class AmountBlock:
+    """Amounts listed one per line, after a line containing start and up to a line beginning
+        with end (bolded bank deposits). Same as the first match of start.*?\n([\d,.\n]+)\nend,
+        split on newlines, but read line by line as the section streams past.
+    """
+    AMOUNT = re.compile(r'[\d,.]*')
+
+    def __init__(self, start: str, end: str):
+        self.start = start
+        self.end = end
+
+    def step(self, block, line):
+        """Advance the scan by one line. block is the amount lines read since the last start
+            line (None outside a block); returns (block, amounts once the block is complete)
+        """
+        if block is not None:
+            if self.AMOUNT.fullmatch(line):
+                block.append(line)
+                return block, None
+            if line.startswith(self.end) and '\n'.join(block):
+                return None, block
+        return ([] if self.start in line else None), None
+
+def tokenize(lines, rules, amount_block: AmountBlock = None):
+    """Run every rule on each line as the lines arrive (any iterable, e.g. a page stream) and
+        scan for the amount block. Returns (one list of column tuples per rule in line order,
+        the block's amounts or None)
+    """
+    found = [[] for _ in rules]
+    block = amounts = None
+    for line in lines:
+        if amount_block is not None and amounts is None:
+            block, amounts = amount_block.step(block, line)
+        if '/' not in line:
+            continue
+        rev = line[::-1]
+        for rule, rows in zip(rules, found):
+            row = rule.match(line, rev)
+            if row is not None:
+                rows.append(row)
+    return found, amounts
@@ -0,0 +1,18 @@
+import re
+
+_DATE = re.compile(r'\b\d{1,2}/\d{1,2}(?:/\d{2,4})?\b')
+_STORE_NUMBER = re.compile(r'#\s*\w+')
+_PUNCTUATION = re.compile(r"[^\w&' ]+")
+
+def normalize_merchant(description: str) -> str:
+    """Merchant key for a transaction description: upper case, without dates, store
+        numbers and reference ids, so recurring charges from one merchant share a key.
+        e.g. 'Card Purchase 01/05 Whole Foods #10234 Seattle WA Card 1234'
+          -> 'CARD PURCHASE WHOLE FOODS SEATTLE WA CARD'
+    """
+    text = _DATE.sub(' ', description.upper())
+    text = _STORE_NUMBER.sub(' ', text)
+    text = _PUNCTUATION.sub(' ', text)
+    # reference ids, card numbers, amounts: any token that is mostly digits
+    tokens = [t for t in text.split() if sum(c.isdigit() for c in t) < 3 and not t.isdigit()]
+    return ' '.join(tokens)
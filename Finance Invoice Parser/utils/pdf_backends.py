@@ -0,0 +1,41 @@
+class PypdfBackend:
+    """Reference extractor; the statement regexes were written against its output"""
+    name = 'pypdf'
+
+    def __init__(self, file_path):
+        from pypdf import PdfReader  # imported by the backend in use only
+        self.reader = PdfReader(file_path)
+
+    def page_count(self) -> int:
+        return self.reader.get_num_pages()
+
+    def page_text(self, index: int) -> str:
+        return self.reader.pages[index].extract_text()
+
+class PyMuPDFBackend:
+    """Faster MuPDF extractor. Text is rebuilt from word boxes in pypdf's layout: words
+        sharing a baseline joined by single spaces, one line per baseline top to bottom,
+        no trailing newline. MuPDF's own get_text() splits columns into separate lines.
+    """
+    name = 'pymupdf'
+
+    def __init__(self, file_path):
+        import pymupdf
+        self.doc = pymupdf.open(file_path)
+
+    def page_count(self) -> int:
+        return self.doc.page_count
+
+    def page_text(self, index: int) -> str:
+        # (x0, y0, x1, y1, word, block_no, line_no, word_no)
+        words = sorted(self.doc[index].get_text('words'), key=lambda w: ((w[1] + w[3]) / 2, w[0]))
+        lines = []
+        for x0, y0, x1, y1, word, *_ in words:
+            middle = (y0 + y1) / 2
+            if lines and abs(middle - lines[-1][0]) <= (y1 - y0) / 2:
+                lines[-1][1].append((x0, word))
+            else:
+                lines.append((middle, [(x0, word)]))
+        return '\n'.join(' '.join(word for x0, word in sorted(line)) for middle, line in lines)
+
+BACKENDS = {backend.name: backend for backend in (PypdfBackend, PyMuPDFBackend)}
@@ -1,31 +1,129 @@
-import logging
+import logging, json, time, os, atexit, queue
 from pathlib import Path
+from collections import Counter
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+LOG_MAX_BYTES = 10 * 2**20  # text and metrics logs rotate at 10MB
+LOG_BACKUPS = 5
+
+class _Router(logging.Handler):
+    """Listener side: pass each record to the handlers registered for its logger"""
+
+    def __init__(self):
+        super().__init__()
+        self.targets = {}  # logger name -> handlers
+
+    def emit(self, record):
+        for handler in self.targets.get(record.name, ()):
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+class _QueueHandler(QueueHandler):
+    """Hand records to the listener thread. Forked workers have no listener thread, so
+        records logged there are written directly instead.
+    """
+
+    def __init__(self, log_queue, router):
+        super().__init__(log_queue)
+        self.router = router
+        self.pid = os.getpid()
+
+    def emit(self, record):
+        if os.getpid() == self.pid:
+            super().emit(record)
+        else:
+            self.router.handle(record)
+
+# one queue and one listener thread per process, shared by every RecordLogs
+_queue = queue.SimpleQueue()
+_router = _Router()
+_listener = None
+
+def _install(logger, handlers):
+    """Route logger through the shared queue; file and console I/O happen on the listener thread"""
+    global _listener
+    _router.targets[logger.name] = handlers
+    logger.addHandler(_QueueHandler(_queue, _router))
+    logger.propagate = False
+    if _listener is None:
+        _listener = QueueListener(_queue, _router)
+        _listener.start()
+        atexit.register(_listener.stop)  # flush what is still queued at exit
 
 class RecordLogs:
+    """Free-text run log plus structured metrics.
+
+        Metrics (timing spans and counters) go to a JSON-lines file next to the log,
+        one object per line: {"ts", "event": "span"|"counters", "name", ...}.
+        logger.info() only enqueues the record; a single background thread formats and
+        writes it. Creating RecordLogs again for the same file_name reuses the handlers.
+    """
 
-    def __init__(self, version, log_path, file_name):
+    def __init__(self, version, log_path, file_name, level=logging.INFO):
         self.version = version
         self.log_path = log_path
+        self.metrics_path = str(Path(log_path).with_suffix('.jsonl'))
         self.file_name = file_name
+        self.level = level
+        self.counters = Counter()
         self.log()
 
     def log(self):
-        logging.basicConfig()
+        logging.basicConfig()  # other libraries still log warnings to the console
         logger = logging.getLogger(self.file_name)
-        logger.setLevel(logging.DEBUG)
+        logger.setLevel(self.level)  # DEBUG also formats the per-file DataFrame dumps
+        metrics = logging.getLogger(f"{self.file_name}.metrics")
+        metrics.setLevel(logging.INFO)
+        self.logger = logger
+        self.metrics = metrics
+        if logger.name in _router.targets:  # already installed in this process
+            return
 
-        # create a file handler
+        # create size-rotated file handlers
         Path(self.log_path).parent.mkdir(parents=True, exist_ok=True)
-        handler = logging.FileHandler(self.log_path)
+        handler = RotatingFileHandler(self.log_path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS)
         handler.setLevel(logging.DEBUG)
+        metrics_handler = RotatingFileHandler(self.metrics_path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS)
 
-        # create a logging format
+        # create a logging format; the console keeps basicConfig's format
         formatter = logging.Formatter('%(asctime)s - %(name)s \t: %(levelname)s - %(message)s')
         handler.setFormatter(formatter)
+        console = logging.StreamHandler()
+        console.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+        metrics_handler.setFormatter(logging.Formatter('%(message)s'))  # bare JSON lines
 
-        # add the file handler to the logger
-        logger.addHandler(handler)
+        # add the handlers behind the queue
+        _install(logger, [handler, console])
+        _install(metrics, [metrics_handler])
         logger.info('Starting a New Run .........................')
         logger.info(f'Version number : {self.version}')
 
-        self.logger = logger
+    def emit(self, event: str, **fields):
+        """Write one JSON line to the metrics file"""
+        self.metrics.info(json.dumps({'ts': round(time.time(), 3), 'event': event, **fields}, default=str))
+
+    @contextmanager
+    def span(self, name: str, **fields):
+        """Time the block and emit it as a span. Yields the fields dict so the block can
+            add results (rows, pages_read, ...); status is 'error' if the block raised.
+        """
+        start = time.perf_counter()
+        fields['status'] = 'ok'
+        try:
+            yield fields
+        except BaseException:
+            fields['status'] = 'error'
+            raise
+        finally:
+            self.emit('span', name=name, seconds=round(time.perf_counter() - start, 6), **fields)
+
+    def count(self, name: str, value=1):
+        """Add to a run counter; counters are written by emit_counters()"""
+        self.counters[name] += value
+
+    def emit_counters(self, name: str):
+        """Write the counters accumulated since the last call as one line, then reset them"""
+        if self.counters:
+            self.emit('counters', name=name, **{k: round(v, 6) for k, v in self.counters.items()})
+            self.counters.clear()
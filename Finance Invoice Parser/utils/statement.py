@@ -0,0 +1,33 @@
+from utils.pdf_backends import BACKENDS
+
+class StatementDocument:
+    """Statement pdf with lazily extracted page text.
+        Pages are 1-indexed to match page_no in invoiceParser.
+        backend: name of a text extractor in utils.pdf_backends.BACKENDS
+    """
+
+    def __init__(self, file_path, backend: str = 'pypdf'):
+        self.file_path = file_path
+        self.backend = BACKENDS[backend](file_path)
+        self.total_pages = self.backend.page_count()
+        self.pages_read = 0  # extractions so far, for the parse metrics
+        self._pages = [None] * self.total_pages
+
+    def page_text(self, page_no: int, keep: bool = True) -> str:
+        """Extract page text on first request. Kept for later calls unless keep is False,
+            so pages that are only streamed once (the activity section) are not all held.
+        """
+        text = self._pages[page_no - 1]
+        if text is None:
+            text = self.backend.page_text(page_no - 1)
+            self.pages_read += 1
+            if keep:
+                self._pages[page_no - 1] = text
+        return text
+
+    def page_lines(self, page_no: int, keep: bool = False):
+        """Yield the page's lines without their newlines"""
+        lines = self.page_text(page_no, keep).split('\n')
+        if lines[-1] == '':  # a page ending in a newline has no extra empty line
+            lines.pop()
+        yield from lines
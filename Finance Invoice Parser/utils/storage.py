@@ -0,0 +1,35 @@
+import sqlite3, os, atexit
+
+DB_PATH = 'finance_data.db'
+
+# (pid, db_path) -> connection; keyed by pid so forked workers never reuse the parent's handle
+_connections = {}
+
+def get_connection(db_path: str = DB_PATH) -> sqlite3.Connection:
+    """Return this process' connection to db_path, opening and configuring it on first use.
+
+        WAL lets dashboards read while we write and turns per-commit fsyncs into appends;
+        synchronous=NORMAL is durable across application crashes in WAL mode.
+        Statements are prepared once and reused from the connection's statement cache.
+    """
+    key = (os.getpid(), db_path)
+    conn = _connections.get(key)
+    if conn is None:
+        conn = sqlite3.connect(db_path, cached_statements=256)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA cache_size=-65536')  # KiB, ~64MB page cache
+        conn.execute('PRAGMA temp_store=MEMORY')
+        _connections[key] = conn
+    return conn
+
+def close_connection(db_path: str = DB_PATH):
+    conn = _connections.pop((os.getpid(), db_path), None)
+    if conn is not None:
+        conn.close()
+
+@atexit.register
+def close_all():
+    for pid, db_path in list(_connections):
+        if pid == os.getpid():
+            close_connection(db_path)
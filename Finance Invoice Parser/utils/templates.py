@@ -0,0 +1,221 @@
+import re
+from datetime import datetime
+from utils.line_tokenizer import AmountBalanceLine, BalanceLine, AmountLine, AmountBlock
+
+INVOICE_TYPES = ('bank', 'card')  # one summary table and archive folder each
+
+class StatementTemplate:
+    """Layout of one issuer's statement. All regexes are compiled once at import.
+
+        fingerprint: phrase (plain text, not a regex) found on page 1 of this layout only.
+        summary_fields: (column or tuple of columns, regex) in output column order; one
+            capture group per column. Single-column fields keep the last match and
+            multi-column fields the first, same as the old findall based extractors.
+        line_items: LineRules (utils.line_tokenizer) with columns date, desc and optionally amt, bal.
+            A rule without an amt column takes its amounts, in order, from amount_block (an AmountBlock).
+    """
+
+    def __init__(self, name, invoice_type, fingerprint, section_end, summary_fields, line_items,
+                 float_columns=(), date_columns=(), date_format=None, negate_columns=(), defaults=(),
+                 id_column=None, section_start=None, amount_block=None, amount_sign=1):
+        self.name = name
+        self.invoice_type = invoice_type  # one of INVOICE_TYPES
+        self.fingerprint = fingerprint
+        self.section_start = re.compile(section_start) if section_start else None
+        self.section_end = re.compile(section_end)
+        self.float_columns = set(float_columns)
+        self.date_columns = set(date_columns)
+        self.date_format = date_format
+        self.negate_columns = set(negate_columns)
+        self.defaults = set(defaults)  # float columns set to 0.0 when not on the statement
+        self.id_column = id_column
+        self.line_items = list(line_items)
+        self.amount_block = amount_block
+        self.amount_sign = amount_sign
+
+        self.fields = []
+        self.columns = []
+        alternatives = []
+        for columns, regex in summary_fields:
+            columns = (columns,) if isinstance(columns, str) else tuple(columns)
+            self.fields.append((columns, re.compile(regex)))
+            self.columns.extend(columns)
+            alternatives.append(f'(?P<f{len(alternatives)}>{regex})')
+        # one alternation over all summary fields so page 1 is scanned once
+        self.summary_regex = re.compile('|'.join(alternatives))
+
+    def _convert(self, column, value):
+        if column in self.float_columns:
+            return float(re.sub(r'[,\$\s]', '', value))
+        if column in self.date_columns:
+            try:
+                return datetime.strptime(value.strip(), self.date_format)
+            except ValueError:
+                return None
+        return value
+
+    def read_summary(self, content: str) -> dict:
+        """Typed summary values from page 1 text, keyed by database column"""
+        found = {}
+        for match in self.summary_regex.finditer(content):
+            i = int(match.lastgroup[1:])
+            columns, regex = self.fields[i]
+            if len(columns) == 1 or i not in found:
+                found[i] = match.groups()[match.re.groupindex[match.lastgroup]:][:len(columns)]
+
+        # fields hidden by an overlapping match of another field
+        for i, (columns, regex) in enumerate(self.fields):
+            if i not in found:
+                matches = regex.findall(content)
+                if matches:
+                    found[i] = matches[-1:] if len(columns) == 1 else matches[0]
+
+        summary = {}
+        for i, (columns, regex) in enumerate(self.fields):
+            if i in found:
+                summary.update({c: self._convert(c, v) for c, v in zip(columns, found[i])})
+            else:
+                summary.update({c: 0.0 for c in columns if c in self.defaults})
+        for column in self.negate_columns & summary.keys():
+            summary[column] = summary[column] * -1
+        return summary
+
+    def invoice_id(self, summary: dict):
+        """Last 4 digits of account/card number + start date, None if either is missing"""
+        number, start = summary.get(self.id_column), summary.get('date_start')
+        if not number or start is None:
+            return None
+        return f"{number[-4:]}_{start.strftime('%Y%m%d')}"
+
+CHASE_CHECKING = StatementTemplate(
+    name='chase_checking',
+    invoice_type='bank',
+    fingerprint='Chase Total Checking',
+    section_end=r'A Monthly Service Fee',
+    summary_fields=[
+        ('beginning_balance', r'Beginning Balance\s+\$([\d.,]+)'),
+        ('ending_balance', r'Ending Balance\s+\$([\d.,]+)'),
+        ('deposits', r'Deposits and Additions\s+([\d,.]+)'),
+        ('withdrawals', r'Electronic Withdrawals\s+\-([\d,.]+)'),
+        (('date_start', 'date_end'), r'\n([\w\s,]+)\s*through\s*([\w\s,]+)\n'),
+        ('account_number', r'(\d+)\nCUSTOMER'),
+    ],
+    float_columns=['beginning_balance', 'ending_balance', 'deposits', 'withdrawals'],
+    date_columns=['date_start', 'date_end'],
+    date_format='%B %d, %Y',
+    negate_columns=['withdrawals'],
+    defaults=['beginning_balance', 'ending_balance', 'deposits', 'withdrawals'],
+    id_column='account_number',
+    line_items=[
+        # withdrawals, then deposits (no '-' on the line, amount is in the bolded block)
+        AmountBalanceLine(),
+        BalanceLine(skip_dashed=True),
+    ],
+    amount_block=AmountBlock('Beginning Balance', 'Ending Balance'),
+)
+
+CHASE_CARD = StatementTemplate(
+    name='chase_card',
+    invoice_type='card',
+    fingerprint='ACCOUNT SUMMARY',
+    section_start=r'ACCOUNT ACTIVITY',
+    section_end=r'INTEREST CHARGES',
+    summary_fields=[
+        ('card_number', r'X{4}\s+(\d{4})'),
+        ('previous_balance', r'Previous Balance\s+\$([\d,.]+)'),
+        ('current_balance', r'Purchases\s+\+\$([\d,.]+)'),
+        (('date_start', 'date_end'), r'Opening/Closing Date\s+(\d+/\d+/\d+)[\s\-]+(\d+/\d+/\d+)'),
+        ('cash_advances', r'Cash Advances\s+\$(-?[\d,.]+)'),
+        ('balance_transfers', r'Balance Transfers\s+\$(-?[\d,.]+)'),
+        ('fees', r'Fees Charged\s+\$(-?[\d,.]+)'),
+        ('interest', r'Interest Charged\s+\$(-?[\d,.]+)'),
+        ('available_credit', r'Available Credit\s+\$([\d,.]+)'),
+        ('credit_limit', r'Credit Access Line\s+\$([\d,.]+)'),
+    ],
+    float_columns=['previous_balance', 'current_balance', 'cash_advances', 'balance_transfers', 'fees',
+                   'interest', 'available_credit', 'credit_limit'],
+    date_columns=['date_start', 'date_end'],
+    date_format='%m/%d/%y',
+    defaults=['previous_balance', 'current_balance'],
+    id_column='card_number',
+    line_items=[
+        AmountLine(),
+    ],
+    # negative is credit and positive is charge on card statements
+    amount_sign=-1,
+)
+
+def _trie_pattern(node) -> str:
+    """Regex for the phrases in a trie with shared prefixes factored out, so at most one
+        branch can match each character and a position costs the same for any number of phrases
+    """
+    branches = [re.escape(char) + _trie_pattern(child) for char, child in sorted(node.items()) if char]
+    if not branches:
+        return ''
+    body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+    return f"(?:{body})?" if '' in node else body  # greedy: the longest phrase at a position
+
+class TemplateRegistry:
+    """Statement templates, detected by their page 1 fingerprint.
+
+        All fingerprints are compiled into one trie-shaped regex, so page 1 is scanned once
+        however many issuers are registered. When several fingerprints are on the page the
+        template registered first wins, same as checking them in order.
+    """
+
+    def __init__(self, templates=()):
+        self.templates = []
+        self._regex = None
+        for template in templates:
+            self.register(template)
+
+    def register(self, template: StatementTemplate):
+        if not template.fingerprint:
+            raise ValueError(f"{template.name}: empty fingerprint")
+        if template.invoice_type not in INVOICE_TYPES:
+            raise ValueError(f"{template.name}: invoice_type must be one of {INVOICE_TYPES}, got {template.invoice_type!r}")
+        self.templates.append(template)
+        self._regex = None  # rebuilt on the next match
+
+    def __iter__(self):
+        return iter(self.templates)
+
+    def __len__(self):
+        return len(self.templates)
+
+    def _compile(self):
+        trie = {}
+        for i, template in enumerate(self.templates):
+            node = trie
+            for char in template.fingerprint:
+                node = node.setdefault(char, {})
+            node.setdefault('', i)  # first template registered with this fingerprint
+
+        # a matched phrase also contains every fingerprint that is a prefix of it
+        self._first = {}
+        for template in self.templates:
+            node, first = trie, len(self.templates)
+            for char in template.fingerprint:
+                node = node[char]
+                first = min(first, node.get('', first))
+            self._first[template.fingerprint] = first
+        self._regex = re.compile(_trie_pattern(trie))
+
+    def match(self, text: str):
+        """Template whose fingerprint is in text (the first registered if several), else None"""
+        if self._regex is None:
+            self._compile()
+        best = None
+        found = self._regex.search(text)
+        while found is not None:
+            first = self._first[found.group()]
+            if best is None or first < best:
+                best = first
+                if best == 0:
+                    break
+            # resume one character on rather than after the match, so overlapping phrases are seen
+            found = self._regex.search(text, found.start() + 1)
+        return None if best is None else self.templates[best]
+
+# add new issuers here; if several fingerprints are on a page the earlier template wins
+TEMPLATES = TemplateRegistry([CHASE_CHECKING, CHASE_CARD])
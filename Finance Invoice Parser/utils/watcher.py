@@ -0,0 +1,134 @@
+import os, time, threading
+
+def _observer_class():
+    """watchdog's Observer (inotify on linux, FSEvents/ReadDirectoryChangesW elsewhere), None if not installed"""
+    try:
+        from watchdog.observers import Observer
+    except ImportError:
+        return None
+    return Observer
+
+class _DirtyPaths:
+    """watchdog event handler: forward file events to the watcher; no stat or parsing on the observer thread"""
+
+    def __init__(self, watcher):
+        self.watcher = watcher
+
+    def dispatch(self, event):
+        if event.is_directory:
+            return
+        self.watcher.touch(event.src_path)
+        if getattr(event, 'dest_path', None):
+            self.watcher.touch(event.dest_path)
+
+class FolderWatcher:
+    """Hand pdfs that land in folders to a work queue once they stop changing.
+
+        A file is ready after its (size, mtime) has been unchanged for settle seconds,
+        so statements still being downloaded or copied are not parsed half written.
+        Uses watchdog when installed; otherwise scans the folders every poll_interval
+        seconds, which only stats directory entries and never opens a file.
+    """
+
+    def __init__(self, folders, settle: float = 2.0, poll_interval: float = 5.0, suffix: str = '.pdf'):
+        self.folders = list(folders)
+        self.settle = settle
+        self.poll_interval = poll_interval
+        self.suffix = suffix
+        self._observer_class = _observer_class()
+        self.mode = 'inotify' if self._observer_class is not None else 'polling'
+        self._pending = {}  # path -> (signature, first seen with that signature)
+        self._queued = {}  # path -> signature it was queued with
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._observer = None
+        self._thread = None
+
+    def touch(self, path):
+        """Mark a path as changed (called from watchdog events)"""
+        if path.lower().endswith(self.suffix):
+            with self._lock:
+                self._dirty.add(path)
+            self._wake.set()
+
+    def scan(self):
+        """Every matching file in the watched folders"""
+        paths = set()
+        for folder in self.folders:
+            try:
+                with os.scandir(folder) as entries:
+                    paths.update(e.path for e in entries if e.is_file() and e.name.lower().endswith(self.suffix))
+            except FileNotFoundError:
+                continue
+        return paths
+
+    def settled(self, candidates, now=None):
+        """Return the candidates whose signature has held for settle seconds and not been queued yet"""
+        now = time.monotonic() if now is None else now
+        ready = []
+        for path in candidates:
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:  # archived or deleted
+                self._pending.pop(path, None)
+                self._queued.pop(path, None)
+                continue
+            signature = (st.st_size, st.st_mtime_ns)
+            if self._queued.get(path) == signature or st.st_size == 0:
+                continue
+            seen = self._pending.get(path)
+            if seen is None or seen[0] != signature:
+                self._pending[path] = (signature, now)
+            elif now - seen[1] >= self.settle:
+                del self._pending[path]
+                self._queued[path] = signature
+                ready.append(path)
+        return sorted(ready)
+
+    def _candidates(self):
+        if self._observer is None:
+            paths = self.scan()
+            for gone in set(self._queued) - paths:
+                del self._queued[gone]
+            return paths
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+        return dirty | set(self._pending)
+
+    def _run(self, work_queue):
+        while not self._stop.is_set():
+            for path in self.settled(self._candidates()):
+                work_queue.put(path)
+            # wake early on events, but keep ticking while files are settling
+            timeout = self.settle / 2 if self._pending else self.poll_interval
+            if self._observer is None or self._pending:
+                self._stop.wait(timeout)
+            else:
+                self._wake.wait()
+            self._wake.clear()
+
+    def start(self, work_queue):
+        """Queue files already in the folders, then keep watching on a background thread"""
+        for folder in self.folders:
+            os.makedirs(folder, exist_ok=True)
+        if self._observer_class is not None:
+            with self._lock:
+                self._dirty.update(self.scan())
+            self._observer = self._observer_class()
+            handler = _DirtyPaths(self)
+            for folder in self.folders:
+                self._observer.schedule(handler, folder, recursive=False)
+            self._observer.start()
+        self._thread = threading.Thread(target=self._run, args=(work_queue,), name='folder-watcher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+        if self._thread is not None:
+            self._thread.join()